@@ -0,0 +1,5 @@
+"""Benchmarks for the CareerPath backend.
+
+Each module is runnable on its own, e.g. ``python -m backend.bench.http_load``.
+They work on a throwaway database and never touch ``career.db``.
+"""
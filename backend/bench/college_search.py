@@ -0,0 +1,76 @@
+"""College search latency: full scan + filter_colleges vs the college index.
+
+    python -m backend.bench.college_search --colleges 40000 --queries 500
+
+``json`` is what the unpaged ``/api/colleges`` does: the same search
+returned as an encoded JSON array (timed warm, after a first pass).
+"""
+import argparse
+import json
+import random
+import time
+
+from ..colleges import college_index
+from ..db import query_all
+from ..logic import COURSE_LABELS, filter_colleges
+from .common import COUNTRIES, insert_colleges, summarize, synthetic_colleges, temp_database
+
+
+def random_queries(n, seed=7):
+    rng = random.Random(seed)
+    for _ in range(n):
+        country = rng.choice(list(COUNTRIES))
+        yield (rng.choice(list(COURSE_LABELS)), rng.choice(COUNTRIES[country]), country,
+               rng.random() < 0.2, rng.choice([0, 0, 100_000, 300_000]),
+               rng.random() < 0.9, rng.random() < 0.9)
+
+
+def _time(fn, queries):
+    latencies = []
+    t0 = time.perf_counter()
+    for q in queries:
+        s = time.perf_counter()
+        fn(q)
+        latencies.append(time.perf_counter() - s)
+    return summarize(latencies, time.perf_counter() - t0)
+
+
+def scan(q):
+    rows = filter_colleges(query_all('SELECT * FROM colleges'), *q)
+    for r in rows:
+        r.pop('city_score', None)
+    return rows
+
+
+def run(colleges=40000, queries=500, verify=True):
+    with temp_database(seed=False):
+        insert_colleges(synthetic_colleges(colleges))
+        t0 = time.perf_counter()
+        college_index.state()
+        build_ms = (time.perf_counter() - t0) * 1000
+        qs = list(random_queries(queries))
+        if verify:
+            for q in qs[:50]:
+                assert scan(q) == college_index.search(*q), q
+                assert json.loads(college_index.search_json(*q)) == college_index.search(*q), q
+        scan_qs = qs[:max(1, min(len(qs), 2_000_000 // max(1, colleges)))]
+        for q in qs:
+            college_index.search_json(*q)
+        return {
+            'build_ms': build_ms,
+            'scan': _time(scan, scan_qs),
+            'index': _time(lambda q: college_index.search(*q), qs),
+            'json': _time(lambda q: college_index.search_json(*q), qs),
+        }
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='College search: full scan vs index')
+    ap.add_argument('--colleges', type=int, default=40000)
+    ap.add_argument('--queries', type=int, default=500)
+    args = ap.parse_args()
+    res = run(args.colleges, args.queries)
+    print(f"index build: {res['build_ms']:.1f} ms")
+    for name in ('scan', 'index', 'json'):
+        s = res[name]
+        print(f"{name:<6} n={s['n']:<6} p50={s['p50_ms']:.3f} ms  p99={s['p99_ms']:.3f} ms")
@@ -0,0 +1,142 @@
+import os
+import random
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from .. import db
+from ..logic import COURSE_LABELS, PERSONALITY_TO_COURSES, STREAM_TO_COURSES
+
+COUNTRIES = {
+    'India': ['Mumbai', 'Delhi', 'Bengaluru', 'Kolkata', 'Chennai', 'Pune', 'Hyderabad', 'Jaipur'],
+    'USA': ['Boston', 'Los Angeles', 'New York', 'Chicago', 'Austin'],
+    'UK': ['London', 'Manchester', 'Edinburgh'],
+    'Australia': ['Melbourne', 'Sydney'],
+    'Canada': ['Toronto', 'Vancouver'],
+}
+
+
+@contextmanager
+def temp_database(seed=True):
+    # Point backend.db at a scratch file for the duration of a benchmark
+    from ..ml_train import seed_colleges, seed_resources
+    from ..tests_engine import seed_questions_if_empty
+
+    tmp = tempfile.mkdtemp(prefix='careerpath-bench-')
+    old = db.DB_FILE
+    db.DB_FILE = os.path.join(tmp, 'bench.db')
+    try:
+        db.init_db()
+        if seed:
+            seed_questions_if_empty()
+            seed_colleges()
+            seed_resources()
+        yield db.DB_FILE
+    finally:
+        db.close_pool()
+        db.DB_FILE = old
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def synthetic_colleges(n, seed=42):
+    # Yields college rows shaped like the colleges table (without id)
+    rng = random.Random(seed)
+    codes = list(COURSE_LABELS)
+    countries = list(COUNTRIES)
+    for i in range(n):
+        country = rng.choice(countries)
+        yield {
+            'name': f'College {i}',
+            'country': country,
+            'city': rng.choice(COUNTRIES[country]),
+            'is_government': int(rng.random() < 0.3),
+            'courses': ','.join(rng.sample(codes, rng.randint(1, 5))),
+            'fees_per_year': rng.randrange(20_000, 600_000, 1000),
+            'scholarships': 'Merit-based',
+            'placements': 'Avg 6 LPA',
+            'website': f'https://college{i}.example',
+        }
+
+
+def insert_colleges(rows):
+    from ..colleges import colleges_changed
+    with db.connect() as con:
+        con.executemany(
+            'INSERT INTO colleges(name, country, city, is_government, courses, fees_per_year, scholarships, placements, website) '
+            'VALUES(:name, :country, :city, :is_government, :courses, :fees_per_year, :scholarships, :placements, :website)',
+            rows)
+    colleges_changed()
+
+
+def synthetic_questions(kind, n, seed=7):
+    # Yields question dicts in the sample_data/questions_*.json shape
+    rng = random.Random(seed)
+    traits = list(PERSONALITY_TO_COURSES)
+    for i in range(n):
+        q = {'question': f'{kind.title()} question {i}',
+             'options': {k: f'Option {k}{i}' for k in 'ABCD'},
+             'difficulty': rng.randint(1, 3)}
+        if kind == 'aptitude':
+            q['answer_key'] = rng.choice('ABCD')
+        else:
+            q['traits'] = {k: {rng.choice(traits): rng.randint(1, 2)} for k in 'ABCD'}
+        yield q
+
+
+def insert_questions(n, seed=7):
+    from ..tests_engine import import_questions
+    for kind in ('aptitude', 'personality'):
+        import_questions(kind, list(synthetic_questions(kind, n, seed)))
+
+
+def insert_resources(per_course, seed=11):
+    rng = random.Random(seed)
+    with db.connect() as con:
+        con.executemany('INSERT INTO resources(course_code, title, url, is_free) VALUES(?,?,?,?)',
+                        [(code, f'{code} resource {i}', f'https://resources.example/{code.lower()}/{i}',
+                          int(rng.random() < 0.8))
+                         for code in COURSE_LABELS for i in range(per_course)])
+    db.notify_change('resources')
+
+
+def synthetic_profile(rng):
+    # A /api/form body
+    country = rng.choice(list(COUNTRIES))
+    return {
+        'highest_qualification': '12th',
+        'stream': rng.choice(list(STREAM_TO_COURSES)),
+        'board_marks': round(rng.uniform(40, 99), 1),
+        'city': rng.choice(COUNTRIES[country]),
+        'country': country,
+        'abroad': rng.random() < 0.2,
+        'budget': rng.choice([0, 150_000, 300_000, 600_000]),
+        'dream_course': rng.choice(list(COURSE_LABELS) + [None] * 6),
+    }
+
+
+def quiet(httpd):
+    # Silence per-request access logging while a benchmark runs
+    class QuietHandler(httpd.RequestHandlerClass):
+        def log_message(self, format, *args):
+            pass
+    httpd.RequestHandlerClass = QuietHandler
+    return httpd
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile over an already sorted list
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, elapsed):
+    lat = sorted(latencies)
+    return {
+        'n': len(lat),
+        'rps': len(lat) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(lat, 50) * 1000,
+        'p95_ms': percentile(lat, 95) * 1000,
+        'p99_ms': percentile(lat, 99) * 1000,
+    }
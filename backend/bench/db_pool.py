@@ -0,0 +1,88 @@
+"""Per-call latency of the db helpers: pooled connections vs connect-per-query.
+
+    python -m backend.bench.db_pool --calls 5000 --threads 1
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from .. import db
+from .common import temp_database, summarize
+
+
+def legacy_query_one(sql, params=()):
+    # The helper as it was before pooling: fresh connection, commit, close
+    con = sqlite3.connect(db.DB_FILE)
+    con.row_factory = sqlite3.Row
+    try:
+        row = con.execute(sql, params).fetchone()
+        con.commit()
+        return dict(row) if row else None
+    finally:
+        con.close()
+
+
+def legacy_execute(sql, params=()):
+    con = sqlite3.connect(db.DB_FILE)
+    try:
+        cur = con.execute(sql, params)
+        con.commit()
+        return cur.lastrowid
+    finally:
+        con.close()
+
+
+CASES = [
+    ('query_one', 'SELECT * FROM colleges WHERE id=?', lambda i: (i % 8 + 1,)),
+    ('execute', 'INSERT INTO sessions(user_id, token, expires_at) VALUES(1,?,datetime("now"))',
+     lambda i: (f'bench-{threading.get_ident()}-{i}-{time.perf_counter_ns()}',)),
+]
+
+
+def _measure(fn, sql, params_fn, calls, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        mine = []
+        for i in range(calls):
+            params = params_fn(i)
+            t0 = time.perf_counter()
+            fn(sql, params)
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return summarize(latencies, time.perf_counter() - t0)
+
+
+def run(calls=5000, threads=1):
+    results = {}
+    with temp_database():
+        db.execute('INSERT INTO users(email,password_hash,salt) VALUES(?,?,?)', ('bench@x', '', ''))
+        for name, sql, params_fn in CASES:
+            legacy = legacy_query_one if name == 'query_one' else legacy_execute
+            pooled = db.query_one if name == 'query_one' else db.execute
+            results[name] = {
+                'connect_per_query': _measure(legacy, sql, params_fn, calls, threads),
+                'pooled': _measure(pooled, sql, params_fn, calls, threads),
+            }
+    return results
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='db helper latency: pooled vs connect-per-query')
+    ap.add_argument('--calls', type=int, default=5000, help='calls per thread')
+    ap.add_argument('--threads', type=int, default=1)
+    args = ap.parse_args()
+    print(f"{'helper':<12}{'strategy':<20}{'calls/s':>10}{'p50 us':>10}{'p99 us':>10}")
+    for name, by_strategy in run(args.calls, args.threads).items():
+        for strategy, s in by_strategy.items():
+            print(f"{name:<12}{strategy:<20}{s['rps']:>10.0f}{s['p50_ms'] * 1000:>10.1f}{s['p99_ms'] * 1000:>10.1f}")
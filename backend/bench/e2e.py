@@ -0,0 +1,269 @@
+"""End-to-end user flow benchmark with baseline comparison.
+
+    python -m backend.bench.e2e --users 200 --clients 16 --out e2e.json
+    python -m backend.bench.e2e --users 200 --clients 16 --baseline e2e.json
+
+Builds a scratch database at the requested scale (synthetic question bank,
+college catalog, resources, and --preload-users existing users with
+profiles and scored tests), starts the server in-process and runs --users
+virtual users through the whole flow, --clients at a time:
+
+    signup -> login -> form -> test start/submit (aptitude, personality)
+    -> recommendations -> colleges -> resources
+
+Each step reports requests/sec, p50/p95/p99 latency, errors and db helper
+calls per request (``careerpath_sql_queries_total``); the run reports peak
+RSS and, with --trace-memory, the peak Python heap. --out saves the results
+as JSON; --baseline compares against a saved run and exits 1 when a step is
+slower, does more queries or fails more than before.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+from .. import db
+from .. import hashing
+from .. import logic
+from .. import metrics
+from .. import serialize
+from .. import writebehind
+from ..server import make_server, warm_caches
+from .common import (insert_colleges, insert_questions, insert_resources, quiet, summarize,
+                     synthetic_colleges, synthetic_profile, temp_database)
+from .http_load import _call
+
+STEPS = ('/api/signup', '/api/login', '/api/form', '/api/test/start', '/api/test/submit',
+         '/api/recommendations', '/api/colleges', '/api/resources')
+
+# (metric, direction): +1 means higher is worse
+COMPARED = (('p50_ms', 1), ('p99_ms', 1), ('rps', -1), ('queries_per_request', 1), ('errors', 1))
+
+
+def preload_users(n, seed=5):
+    # Existing users with a profile and both tests scored, so per-user
+    # queries run against tables of a realistic size
+    rng = random.Random(seed)
+    traits = list(logic.PERSONALITY_TO_COURSES)
+    with db.connect() as con:
+        start = con.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]
+        con.executemany('INSERT INTO users(id, email, password_hash, salt) VALUES(?,?,?,?)',
+                        [(start + i + 1, f'preload{i}@bench.example', '0' * 64, '0' * 32) for i in range(n)])
+        profiles, sessions = [], []
+        for i in range(n):
+            uid = start + i + 1
+            p = synthetic_profile(rng)
+            profiles.append((uid, p['highest_qualification'], p['stream'], p['board_marks'], p['city'],
+                             p['country'], int(p['abroad']), p['budget'], p['dream_course']))
+            score = rng.randint(0, 20)
+            sessions.append((uid, 'aptitude', score, 20, json.dumps({'score': score})))
+            sessions.append((uid, 'personality', 0, 20, json.dumps({rng.choice(traits): 4})))
+        con.executemany('INSERT INTO profiles(user_id, highest_qualification, stream, board_marks, city, country, abroad, budget, dream_course) '
+                        'VALUES(?,?,?,?,?,?,?,?,?)', profiles)
+        con.executemany('INSERT INTO test_sessions(user_id, kind, score, total_marks, result_json) VALUES(?,?,?,?,?)', sessions)
+
+
+def build(questions=200, colleges=10_000, resources=50, users=1000):
+    t0 = time.perf_counter()
+    insert_questions(questions)
+    insert_colleges(synthetic_colleges(colleges))
+    insert_resources(resources)
+    preload_users(users)
+    warm_caches()
+    return time.perf_counter() - t0
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = dict.fromkeys(STEPS, 0)
+
+    def add(self, step, seconds, ok):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+
+def _flow(conn, rng, index, rec):
+    def step(path, body, token=None):
+        t0 = time.perf_counter()
+        try:
+            status, data = _call(conn, 'POST', path, body, token)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            status, data = 0, b''
+        rec.add(path, time.perf_counter() - t0, status == 200)
+        if status != 200:
+            raise LookupError(path)
+        return json.loads(data)
+
+    email = f'e2e{index}@bench.example'
+    step('/api/signup', {'email': email, 'password': 'secret'})
+    token = step('/api/login', {'email': email, 'password': 'secret'})['token']
+    profile = synthetic_profile(rng)
+    step('/api/form', profile, token)
+    for kind in ('aptitude', 'personality'):
+        test = step('/api/test/start', {'kind': kind}, token)
+        answers = {str(q['id']): rng.choice(sorted(q['options'])) for q in test['questions']}
+        step('/api/test/submit', {'session_id': test['session_id'], 'answers': answers}, token)
+    courses = step('/api/recommendations', {}, token)['courses']
+    code = courses[0]['code'] if courses else profile['dream_course'] or 'CSE'
+    step('/api/colleges', {'course_code': code, 'city': profile['city'], 'country': profile['country'],
+                           'abroad': profile['abroad'], 'budget': profile['budget']}, token)
+    step('/api/resources', {'course_code': code}, token)
+
+
+def drive(host, port, users, clients, seed=1):
+    rec = Recorder()
+    indexes = itertools.count()
+    failed = [0]
+
+    def client(n):
+        rng = random.Random(seed * 1000 + n)
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        while True:
+            i = next(indexes)
+            if i >= users:
+                break
+            try:
+                _flow(conn, rng, i, rec)
+            except LookupError:
+                failed[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return rec, time.perf_counter() - t0, failed[0]
+
+
+def _rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run(users=200, clients=16, workers=32, questions=200, colleges=10_000, resources=50, preload=1000,
+        write_batch=0, trace_memory=False, seed=1):
+    config = {'users': users, 'clients': clients, 'workers': workers, 'questions': questions,
+              'colleges': colleges, 'resources': resources, 'preload_users': preload,
+              'write_batch': write_batch, 'seed': seed}
+    hashing.configure()
+    with temp_database(seed=False):
+        build_s = build(questions, colleges, resources, preload)
+        writebehind.configure(write_batch)
+        httpd = quiet(make_server('127.0.0.1', 0, 'pooled', workers))
+        host, port = httpd.server_address[:2]
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        queries_before = {step: metrics.sql_queries.value(step) for step in STEPS}
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            rec, elapsed, failed = drive(host, port, users, clients, seed)
+        finally:
+            traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+            httpd.shutdown()
+            httpd.server_close()
+            writebehind.configure()
+
+    steps = {}
+    for step in STEPS:
+        lat = rec.latencies[step]
+        s = summarize(lat, elapsed)
+        s['errors'] = rec.errors[step]
+        s['queries_per_request'] = (metrics.sql_queries.value(step) - queries_before[step]) / len(lat) if lat else 0.0
+        steps[step] = s
+    requests = sum(len(v) for v in rec.latencies.values())
+    return {
+        'config': config,
+        'env': {'python': platform.python_version(), 'platform': platform.platform(),
+                'json': serialize.encoder.name, 'numpy': logic.np is not None},
+        'build_seconds': build_s,
+        'seconds': elapsed,
+        'flows': users - failed,
+        'failed_flows': failed,
+        'flows_per_s': (users - failed) / elapsed,
+        'requests_per_s': requests / elapsed,
+        'memory': {'rss_peak_mb': _rss_mb(),
+                   'traced_peak_mb': traced_peak / (1 << 20) if traced_peak is not None else None},
+        'steps': steps,
+    }
+
+
+def compare(current, baseline, tolerance=0.25):
+    # [(step, metric, baseline, current, relative change)] beyond tolerance;
+    # query counts and errors are deterministic enough to allow no growth
+    regressions = []
+    for step, base in baseline['steps'].items():
+        cur = current['steps'].get(step)
+        if cur is None:
+            continue
+        for key, direction in COMPARED:
+            b, c = base.get(key), cur.get(key)
+            if b is None or c is None:
+                continue
+            allowed = 0.0 if key in ('queries_per_request', 'errors') else tolerance
+            change = (c - b) / b if b else (float('inf') if c > b else 0.0)
+            if change * direction > allowed + 1e-9:
+                regressions.append((step, key, b, c, change))
+    return regressions
+
+
+def print_report(res):
+    m = res['memory']
+    print(f"{res['flows']} flows ({res['failed_flows']} failed) in {res['seconds']:.1f}s: "
+          f"{res['flows_per_s']:.1f} flows/s, {res['requests_per_s']:.1f} req/s, "
+          f"peak RSS {m['rss_peak_mb']:.0f} MB"
+          + (f", peak heap {m['traced_peak_mb']:.1f} MB" if m['traced_peak_mb'] is not None else ''))
+    print(f"{'step':<24}{'n':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for step, s in res['steps'].items():
+        print(f"{step:<24}{s['n']:>7}{s['errors']:>6}{s['rps']:>9.1f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}"
+              f"{s['p99_ms']:>9.2f}{s['queries_per_request']:>9.2f}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='End-to-end CareerPath flow benchmark')
+    ap.add_argument('--users', type=int, default=200, help='virtual users run through the flow')
+    ap.add_argument('--clients', type=int, default=16, help='users in flight at once')
+    ap.add_argument('--workers', type=int, default=32, help='server worker threads')
+    ap.add_argument('--questions', type=int, default=200, help='synthetic questions per test kind')
+    ap.add_argument('--colleges', type=int, default=10_000)
+    ap.add_argument('--resources', type=int, default=50, help='resources per course')
+    ap.add_argument('--preload-users', type=int, default=1000, help='existing users with profiles and tests')
+    ap.add_argument('--write-batch', type=int, default=0, help='server --write-batch')
+    ap.add_argument('--trace-memory', action='store_true', help='also report peak Python heap (slower)')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--out', help='save results as JSON')
+    ap.add_argument('--baseline', help='JSON results to compare against')
+    ap.add_argument('--tolerance', type=float, default=0.25,
+                    help='allowed relative slowdown vs baseline (latency is noisy on small runs)')
+    args = ap.parse_args()
+    res = run(args.users, args.clients, args.workers, args.questions, args.colleges, args.resources,
+              args.preload_users, args.write_batch, args.trace_memory, args.seed)
+    print_report(res)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(res, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(res, baseline, args.tolerance)
+        for step, key, b, c, change in regressions:
+            print(f'REGRESSION {step} {key}: {b:.2f} -> {c:.2f} ({change:+.0%})')
+        if regressions:
+            raise SystemExit(1)
+        print(f'no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})')
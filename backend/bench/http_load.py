@@ -0,0 +1,145 @@
+"""Load benchmark for the /api/* routes.
+
+Starts the server in-process on a scratch database and drives every route
+with concurrent keep-alive clients, reporting requests/sec and p50/p99
+latency per route:
+
+    python -m backend.bench.http_load --mode pooled --clients 16 --requests 400
+"""
+import argparse
+import http.client
+import itertools
+import json
+import threading
+import time
+
+from .. import hashing
+from ..server import make_server
+from .common import quiet, temp_database, summarize
+
+_emails = itertools.count()
+
+
+def _call(conn, method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = 'Bearer ' + token
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    conn.request(method, path, body=payload, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    return resp.status, data
+
+
+def _routes(ctx):
+    return [
+        ('/api/signup', 'POST', lambda: {'email': f'load{next(_emails)}@bench.example', 'password': 'secret'}),
+        ('/api/login', 'POST', lambda: {'email': ctx['email'], 'password': ctx['password']}),
+        ('/api/form', 'POST', lambda: ctx['profile']),
+        ('/api/test/start', 'POST', lambda: {'kind': 'aptitude'}),
+        ('/api/test/submit', 'POST', lambda: {'session_id': ctx['session_id'], 'answers': ctx['answers']}),
+        ('/api/recommendations', 'POST', lambda: {}),
+        ('/api/resources', 'POST', lambda: {'course_code': 'CSE'}),
+        ('/api/colleges', 'POST', lambda: {'course_code': 'CSE', 'city': 'Mumbai', 'country': 'India'}),
+        ('/api/college?id=1', 'GET', lambda: None),
+    ]
+
+
+def _setup(host, port):
+    ctx = {'email': 'bench@bench.example', 'password': 'secret',
+           'profile': {'highest_qualification': '12th', 'stream': 'Science', 'board_marks': 88,
+                       'city': 'Mumbai', 'country': 'India', 'abroad': False, 'budget': 300000,
+                       'dream_course': 'AI'}}
+    conn = http.client.HTTPConnection(host, port)
+    _call(conn, 'POST', '/api/signup', {'email': ctx['email'], 'password': ctx['password']})
+    _, data = _call(conn, 'POST', '/api/login', {'email': ctx['email'], 'password': ctx['password']})
+    ctx['token'] = json.loads(data)['token']
+    _call(conn, 'POST', '/api/form', ctx['profile'], ctx['token'])
+    _, data = _call(conn, 'POST', '/api/test/start', {'kind': 'aptitude'}, ctx['token'])
+    started = json.loads(data)
+    ctx['session_id'] = started['session_id']
+    ctx['answers'] = {str(q['id']): 'A' for q in started['questions']}
+    conn.close()
+    return ctx
+
+
+def run_route(host, port, method, path, body_fn, token, clients, requests):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_client = max(1, requests // clients)
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        mine = []
+        bad = 0
+        for _ in range(per_client):
+            t0 = time.perf_counter()
+            try:
+                status, _ = _call(conn, method, path, body_fn(), token)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = 0
+            mine.append(time.perf_counter() - t0)
+            if status >= 400 or status == 0:
+                bad += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += bad
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = summarize(latencies, time.perf_counter() - t0)
+    stats['errors'] = errors[0]
+    return stats
+
+
+def run(mode='pooled', workers=16, clients=16, requests=400, routes=None, hash_workers=0, hash_queue=None):
+    results = {}
+    hashing.configure(hash_workers, hash_queue)
+    with temp_database():
+        httpd = quiet(make_server('127.0.0.1', 0, mode, workers))
+        host, port = httpd.server_address[:2]
+        server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        server_thread.start()
+        try:
+            ctx = _setup(host, port)
+            for path, method, body_fn in _routes(ctx):
+                if routes and path not in routes:
+                    continue
+                token = None if path in ('/api/signup', '/api/login') else ctx['token']
+                results[path] = run_route(host, port, method, path, body_fn, token, clients, requests)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            hashing.hash_pool.shutdown()
+    return results
+
+
+def print_report(results):
+    print(f"{'route':<24}{'n':>7}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for path, s in results.items():
+        print(f"{path:<24}{s['n']:>7}{s['errors']:>6}{s['rps']:>10.1f}{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Load benchmark for the CareerPath API')
+    ap.add_argument('--mode', choices=('simple', 'pooled'), default='pooled')
+    ap.add_argument('--workers', type=int, default=16)
+    ap.add_argument('--clients', type=int, default=16)
+    ap.add_argument('--requests', type=int, default=400, help='requests per route')
+    ap.add_argument('--route', action='append', help='only run this route (repeatable)')
+    ap.add_argument('--hash-workers', type=int, default=0)
+    ap.add_argument('--hash-queue', type=int, default=None)
+    args = ap.parse_args()
+    print_report(run(args.mode, args.workers, args.clients, args.requests, args.route,
+                     args.hash_workers, args.hash_queue))
+    for route, s in hashing.hash_pool.stats().items():
+        n = max(1, s['count'])
+        print(f"hash {route:<19} n={s['count']} rejected={s['rejected']} "
+              f"wait avg={s['wait_seconds'] / n * 1000:.1f} ms  compute avg={s['compute_seconds'] / n * 1000:.1f} ms")
@@ -0,0 +1,71 @@
+"""Bulk college loading on a generated catalog.
+
+Writes an N-row colleges CSV (1M by default), loads it with
+``backend.ingest``, loads it again to show the upsert is idempotent, and
+times the old one-execute-per-row approach on a small sample for contrast.
+
+    python -m backend.bench.ingest --rows 1000000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from .. import db, ingest
+from .common import synthetic_colleges, temp_database
+from .db_pool import legacy_execute
+
+FIELDS = ['name', 'country', 'city', 'is_government', 'courses', 'fees_per_year',
+          'scholarships', 'placements', 'website']
+
+
+def write_csv(path, rows, seed=42):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(synthetic_colleges(rows, seed))
+
+
+def legacy_load(path, limit):
+    # One connection and commit per row, as the seeder did before bulk loading
+    t0 = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            if i >= limit:
+                break
+            legacy_execute('INSERT INTO colleges (name, country, city, is_government, courses, fees_per_year, '
+                       'scholarships, placements, website) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       tuple(row[k] for k in FIELDS))
+    elapsed = time.perf_counter() - t0
+    return limit / elapsed if elapsed else 0.0
+
+
+def run(rows=1_000_000, batch=ingest.BATCH_SIZE, legacy_rows=5000):
+    with tempfile.TemporaryDirectory(prefix='careerpath-ingest-') as tmp:
+        path = os.path.join(tmp, 'colleges.csv')
+        write_csv(path, rows)
+        results = {}
+        with temp_database(seed=False):
+            first = ingest.load_colleges(path, batch_size=batch)
+            second = ingest.load_colleges(path, batch_size=batch)
+            count = db.query_one('SELECT COUNT(1) AS n FROM colleges')['n']
+            results['bulk'] = {'rows_per_sec': first.rows_per_sec, 'seconds': first.seconds}
+            results['bulk_rerun'] = {'rows_per_sec': second.rows_per_sec, 'seconds': second.seconds}
+            results['table_rows'] = count
+        with temp_database(seed=False):
+            results['legacy_rows_per_sec'] = legacy_load(path, min(rows, legacy_rows))
+    return results
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Bulk college ingestion benchmark')
+    ap.add_argument('--rows', type=int, default=1_000_000)
+    ap.add_argument('--batch', type=int, default=ingest.BATCH_SIZE)
+    ap.add_argument('--legacy-rows', type=int, default=5000)
+    args = ap.parse_args()
+    r = run(args.rows, args.batch, args.legacy_rows)
+    print(f"bulk load     {r['bulk']['seconds']:8.2f} s  {r['bulk']['rows_per_sec']:>10,.0f} rows/s")
+    print(f"bulk re-run   {r['bulk_rerun']['seconds']:8.2f} s  {r['bulk_rerun']['rows_per_sec']:>10,.0f} rows/s")
+    print(f"rows in table {r['table_rows']:,} (after both runs)")
+    print(f"per-row legacy              {r['legacy_rows_per_sec']:>10,.0f} rows/s")
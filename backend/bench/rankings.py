@@ -0,0 +1,91 @@
+"""/api/colleges search latency by catalog size: scan vs postings walk vs rankings.
+
+    python -m backend.bench.rankings --sizes 100 1000 10000 100000 1000000 --queries 300
+
+``scan`` is the original full-table read + filter_colleges (skipped above
+--scan-limit colleges); ``walk`` is the index before rankings, which looped
+over the fee-sorted postings per request; ``ranking`` is the current
+``college_index.search``. Each is timed after the index is warm.
+"""
+import argparse
+import time
+
+from ..colleges import college_index
+from .college_search import random_queries, scan
+from .common import insert_colleges, summarize, synthetic_colleges, temp_database
+
+
+def legacy_walk(course_code, city, country, abroad, budget, include_private=True, include_government=True):
+    state = college_index.state()
+    store = state['store']
+    country_l = (country or '').lower()
+    city_l = (city or '').lower()
+    same_city, others = [], []
+    for p in state['by_course'].get(course_code, ()):
+        if budget and store.fees[p] > budget:
+            break
+        if (store.country_l[p] == country_l) == abroad:
+            continue
+        is_gov = store.gov[p]
+        if not include_private and not is_gov:
+            continue
+        if not include_government and is_gov:
+            continue
+        (same_city if store.city_l[p] == city_l else others).append(p)
+    return store.rows(same_city + others)
+
+
+def _time(fn, queries):
+    latencies = []
+    t0 = time.perf_counter()
+    for q in queries:
+        s = time.perf_counter()
+        fn(*q)
+        latencies.append(time.perf_counter() - s)
+    return summarize(latencies, time.perf_counter() - t0)
+
+
+def run_size(n, queries=300, scan_limit=10_000, verify=True):
+    with temp_database(seed=False):
+        insert_colleges(synthetic_colleges(n))
+        t0 = time.perf_counter()
+        college_index.state()
+        build_ms = (time.perf_counter() - t0) * 1000
+        qs = list(random_queries(queries))
+        # First pass materializes the rankings the queries touch
+        t0 = time.perf_counter()
+        for q in qs:
+            college_index.search(*q)
+        materialize_ms = (time.perf_counter() - t0) * 1000
+        if verify:
+            for q in qs[:20]:
+                assert legacy_walk(*q) == college_index.search(*q), q
+        res = {
+            'colleges': n,
+            'build_ms': build_ms,
+            'materialize_ms': materialize_ms,
+            'walk': _time(legacy_walk, qs),
+            'ranking': _time(college_index.search, qs),
+        }
+        if n <= scan_limit:
+            res['scan'] = _time(lambda *q: scan(q), qs[:100])
+        return res
+
+
+def run(sizes=(100, 1000, 10_000, 100_000, 1_000_000), queries=300, scan_limit=10_000):
+    return [run_size(n, queries, scan_limit) for n in sizes]
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='College search latency by catalog size')
+    ap.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10_000, 100_000, 1_000_000])
+    ap.add_argument('--queries', type=int, default=300)
+    ap.add_argument('--scan-limit', type=int, default=10_000)
+    args = ap.parse_args()
+    print(f"{'colleges':>9} {'build ms':>9} {'mat. ms':>8}  {'scan p50/p99 ms':>17}  {'walk p50/p99 ms':>17}  {'ranking p50/p99 ms':>19}")
+    for r in run(args.sizes, args.queries, args.scan_limit):
+        cols = []
+        for name in ('scan', 'walk', 'ranking'):
+            s = r.get(name)
+            cols.append(f"{s['p50_ms']:>8.3f}/{s['p99_ms']:<8.3f}" if s else f"{'-':>17}")
+        print(f"{r['colleges']:>9} {r['build_ms']:>9.1f} {r['materialize_ms']:>8.1f}  {cols[0]}  {cols[1]}  {cols[2]:>19}")
@@ -0,0 +1,48 @@
+"""Throughput of recommend_courses_batch, NumPy vs pure Python.
+
+    python -m backend.bench.recommend --sizes 10000 1000000
+"""
+import argparse
+import random
+import time
+
+from .. import logic
+
+
+def random_profiles(n, seed=3):
+    rng = random.Random(seed)
+    streams = list(logic.STREAM_TO_COURSES)
+    types = list(logic.PERSONALITY_TO_COURSES)
+    dreams = list(logic.COURSE_DIFFICULTY) + [None] * 8
+    return [(rng.choice(streams), round(rng.uniform(35, 100), 1), rng.randint(0, 20),
+             rng.choice(types), rng.choice(dreams)) for _ in range(n)]
+
+
+def run(sizes=(10_000, 1_000_000)):
+    results = {}
+    backends = [('python', False)] + ([('numpy', True)] if logic.np is not None else [])
+    for n in sizes:
+        profiles = random_profiles(n)
+        out = {}
+        for name, use_numpy in backends:
+            t0 = time.perf_counter()
+            res = logic.recommend_courses_batch(profiles, use_numpy=use_numpy)
+            elapsed = time.perf_counter() - t0
+            out[name] = {'seconds': elapsed, 'profiles_per_s': n / elapsed if elapsed else 0.0, 'result': res}
+        if len(out) == 2:
+            assert out['python']['result'] == out['numpy']['result']
+        for v in out.values():
+            del v['result']
+        results[n] = out
+    return results
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Batch recommendation throughput')
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000])
+    args = ap.parse_args()
+    if logic.np is None:
+        print('numpy not installed: timing the pure-Python path only')
+    for n, by_backend in run(args.sizes).items():
+        for name, s in by_backend.items():
+            print(f"{n:>9} profiles  {name:<7}{s['seconds']:>8.2f} s{s['profiles_per_s']:>12.0f} profiles/s")
@@ -0,0 +1,71 @@
+"""Per-request dispatch overhead: route table vs an if-chain, by endpoint count.
+
+    python -m backend.bench.router --routes 10 100 1000 10000 --calls 200000
+"""
+import argparse
+import random
+import time
+
+from ..router import Router
+
+
+class _FakeHandler:
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+
+def _noop(handler, req):
+    return None
+
+
+def build(n):
+    router = Router()
+    chain = []
+    for i in range(n):
+        path = f'/api/endpoint/{i}'
+        router.route('POST', path)(_noop)
+        chain.append(path)
+    return router, chain
+
+
+def if_chain(chain, handler):
+    # Stand-in for the old do_POST: compare the path to each endpoint in turn
+    path = handler.path
+    for candidate in chain:
+        if path == candidate:
+            return _noop(handler, None)
+    return None
+
+
+def _time(fn, handlers):
+    t0 = time.perf_counter()
+    for h in handlers:
+        fn(h)
+    return (time.perf_counter() - t0) / len(handlers) * 1e9
+
+
+def run(counts=(10, 100, 1000, 10000), calls=200_000, seed=3):
+    rng = random.Random(seed)
+    results = []
+    for n in counts:
+        router, chain = build(n)
+        handlers = [_FakeHandler(f'/api/endpoint/{rng.randrange(n)}') for _ in range(calls)]
+        chain_calls = handlers[:max(1000, calls * 10 // n)]
+        results.append({
+            'routes': n,
+            'router_ns': _time(lambda h: router.dispatch(h, 'POST'), handlers),
+            'if_chain_ns': _time(lambda h: if_chain(chain, h), chain_calls),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Router dispatch overhead by endpoint count')
+    ap.add_argument('--routes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    ap.add_argument('--calls', type=int, default=200_000)
+    args = ap.parse_args()
+    print(f"{'routes':>8} {'router ns':>12} {'if-chain ns':>12}")
+    for r in run(args.routes, args.calls):
+        print(f"{r['routes']:>8} {r['router_ns']:>12.0f} {r['if_chain_ns']:>12.0f}")
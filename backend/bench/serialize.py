@@ -0,0 +1,85 @@
+"""Listing serialization throughput: Row -> dict -> json.dumps vs cursor tuples.
+
+    python -m backend.bench.serialize --rows 100000 --repeat 5
+
+Times the full path behind a large /api/resources response (query plus
+encoding to bytes) and reports JSON bytes/sec. ``legacy`` is the old
+query_all + json.dumps(ensure_ascii=False); the others go through
+serialize.encode_rows with each available encoder. ``+gzip`` adds the
+opt-in response compression on top, and ``cached`` is a warm
+``resources.resource_cache`` hit, which is what the endpoint now serves.
+"""
+import argparse
+import gzip
+import json
+import time
+
+from .. import db
+from .. import serialize
+from ..resources import resource_cache
+from ..router import GZIP_LEVEL
+from .common import temp_database
+
+SQL = 'SELECT title,url FROM resources WHERE course_code=? AND is_free=1 ORDER BY id'
+
+
+def insert_resources(n, code='BTECH'):
+    with db.connect() as con:
+        con.executemany('INSERT INTO resources(course_code, title, url, is_free) VALUES(?,?,?,1)',
+                        [(code, f'Resource {i}: lecture notes, problem sets & café talks',
+                          f'https://resources.example/{code.lower()}/{i}') for i in range(n)])
+
+
+def legacy(code):
+    rows = db.query_all(SQL, (code,))
+    return json.dumps({'resources': rows}, ensure_ascii=False).encode('utf-8')
+
+
+def current(code):
+    columns, rows = db.query_rows(SQL, (code,))
+    return serialize.listing('resources', serialize.encode_rows(columns, rows))
+
+
+def _best(fn, repeat):
+    best, out = float('inf'), b''
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(rows=100_000, repeat=5):
+    results = []
+    with temp_database(seed=False):
+        insert_resources(rows)
+        expected = json.loads(legacy('BTECH'))
+        json_size = len(current('BTECH'))
+        cases = [('legacy', lambda: legacy('BTECH'))]
+        for name in serialize.ENCODERS:
+            cases.append((name, lambda name=name: (serialize.use(name), current('BTECH'))[1]))
+        cases.append((f'{serialize.use().name}+gzip',
+                      lambda: gzip.compress(current('BTECH'), compresslevel=GZIP_LEVEL, mtime=0)))
+        resource_cache.invalidate()
+        cases.append(('cached', lambda: resource_cache.listing('BTECH')))
+        for name, fn in cases:
+            seconds, out = _best(fn, repeat)
+            size = len(out)
+            if name.endswith('gzip'):
+                size = json_size
+            else:
+                assert json.loads(out) == expected, name
+            results.append({'name': name, 'seconds': seconds, 'wire_bytes': len(out),
+                            'mb_per_s': size / seconds / 1e6, 'rows_per_s': rows / seconds})
+        serialize.use()
+    return results
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Listing serialization throughput')
+    ap.add_argument('--rows', type=int, default=100_000)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+    print(f"{'path':<14} {'ms':>8} {'wire bytes':>10} {'JSON MB/s':>9} {'rows/s':>10}")
+    for r in run(args.rows, args.repeat):
+        print(f"{r['name']:<14} {r['seconds'] * 1000:>8.1f} {r['wire_bytes']:>10} {r['mb_per_s']:>9.1f} {r['rows_per_s']:>10.0f}")
@@ -0,0 +1,95 @@
+"""Sustained /api/test/submit throughput, committing inline vs group commit.
+
+    python -m backend.bench.writes --clients 32 --seconds 5 --batches 0 32 128
+
+Each client starts its own test session and then submits it in a loop on a
+keep-alive connection for --seconds. ``--batches 0`` is the old path (one
+transaction per request); any other value runs the server with that
+``--write-batch``. The report shows requests/sec, latency, errors (including
+``database is locked``) and how many writes each transaction carried.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+
+from .. import writebehind
+from ..server import make_server
+from .common import quiet, summarize, temp_database
+from .http_load import _call, _setup
+
+
+def _client(host, port, token, seconds, out, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    _, data = _call(conn, 'POST', '/api/test/start', {'kind': 'aptitude'}, token)
+    started = json.loads(data)
+    body = {'session_id': started['session_id'],
+            'answers': {str(q['id']): 'A' for q in started['questions']}}
+    latencies = []
+    errors = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        try:
+            status, _ = _call(conn, 'POST', '/api/test/submit', body, token)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            status = 0
+        latencies.append(time.perf_counter() - t0)
+        if status != 200:
+            errors += 1
+    conn.close()
+    with lock:
+        out['latencies'].extend(latencies)
+        out['errors'] += errors
+
+
+def run_one(batch, clients=32, seconds=5.0, delay=writebehind.MAX_DELAY):
+    with temp_database():
+        writer = writebehind.configure(batch, delay)
+        httpd = quiet(make_server('127.0.0.1', 0, 'pooled', clients))
+        host, port = httpd.server_address[:2]
+        server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        server_thread.start()
+        try:
+            ctx = _setup(host, port)
+            before = writer.stats()
+            out = {'latencies': [], 'errors': 0}
+            lock = threading.Lock()
+            threads = [threading.Thread(target=_client, args=(host, port, ctx['token'], seconds, out, lock))
+                       for _ in range(clients)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            res = summarize(out['latencies'], time.perf_counter() - t0)
+            after = writer.stats()
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            writebehind.configure()
+        batches = after['batches'] - before['batches']
+        res.update(batch=batch, errors=out['errors'], transactions=batches,
+                   writes_per_txn=(after['writes'] - before['writes']) / batches if batches else 0.0)
+        return res
+
+
+def run(batches=(0, 32, 128), clients=32, seconds=5.0, delay=writebehind.MAX_DELAY):
+    return [run_one(b, clients, seconds, delay) for b in batches]
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Test submit throughput with and without group commit')
+    ap.add_argument('--batches', type=int, nargs='+', default=[0, 32, 128],
+                    help='--write-batch values to compare (0 = inline commits)')
+    ap.add_argument('--clients', type=int, default=32)
+    ap.add_argument('--seconds', type=float, default=5.0)
+    ap.add_argument('--delay-ms', type=float, default=writebehind.MAX_DELAY * 1000)
+    args = ap.parse_args()
+    print(f"{'batch':>6}{'n':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'txns':>8}{'writes/txn':>12}")
+    for r in run(args.batches, args.clients, args.seconds, args.delay_ms / 1000):
+        label = r['batch'] or 'inline'
+        print(f"{label:>6}{r['n']:>8}{r['errors']:>6}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['transactions']:>8}{r['writes_per_txn']:>12.1f}")
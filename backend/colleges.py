@@ -0,0 +1,414 @@
+"""In-memory college search index.
+
+Replaces the full-table scan + ``logic.filter_colleges`` pass behind
+``/api/colleges``. The catalog is held in a ``CollegeStore``: one plain
+tuple per college with repeated strings (countries, cities, course lists)
+and fees interned, flat lists of the fields filtering reads, and course
+membership, taken from the normalized ``college_courses`` table, as one
+bitset per college over the course codes. Per course the index keeps the
+store positions sorted by fee.
+
+On top of that, ``Ranking`` materializes each (course, country, abroad)
+combination that gets queried as parallel arrays, so the per-request work
+is a bisect for the budget plus a slice or one filtering pass for the city
+boost and the private/government flags. None of that allocates per row;
+row dicts are built only for the rows a request returns, and the unpaged
+listing joins JSON that each record keeps once it has been output.
+"""
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import repeat
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from . import serialize
+from .db import connect, on_change, notify_change
+from .logic import COURSE_LABELS
+
+
+def course_codes(courses: str) -> List[str]:
+    # Same split/strip as logic.filter_colleges, minus empty codes
+    return [s for s in (p.strip() for p in (courses or '').split(',')) if s]
+
+
+def rebuild_course_map(ids=None):
+    # Re-derive college_courses from colleges.courses (all rows, or just ids)
+    with connect() as con:
+        if ids is None:
+            con.execute('DELETE FROM college_courses')
+            rows = con.execute('SELECT id, courses FROM colleges').fetchall()
+        else:
+            ids = list(ids)
+            con.executemany('DELETE FROM college_courses WHERE college_id=?', [(i,) for i in ids])
+            rows = []
+            for i in ids:
+                rows.extend(con.execute('SELECT id, courses FROM colleges WHERE id=?', (i,)).fetchall())
+        con.executemany('INSERT OR IGNORE INTO college_courses(course_code, college_id) VALUES(?,?)',
+                        [(code, r['id']) for r in rows for code in course_codes(r['courses'])])
+
+
+# Columns whose values repeat across colleges share one string object
+_INTERNED = ('country', 'city', 'courses', 'scholarships', 'placements')
+
+
+class CollegeStore:
+    """The colleges table as one tuple per college plus filter columns.
+
+    A college is a position ``p``: ``records[p]`` is its row in ``columns``
+    order, with repeated strings and fees interned. ``fees``, ``gov``, ``country_l``
+    and ``city_l`` (interned, lowercase) repeat what filtering reads as flat
+    lists, and ``masks[p]`` is the course bitset. ``encoded[p]`` is the
+    row's JSON object, filled in the first time it is output. Positions are
+    stable: a re-read college is appended and its old position only drops
+    out of ``pos`` (id -> position), so rankings over other colleges stay
+    valid.
+    """
+    __slots__ = ('columns', 'records', 'ids', 'fees', 'gov', 'country_l', 'city_l', 'masks', 'encoded',
+                 'positions', 'pos', '_interned', '_keys', '_shared')
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = tuple(columns)
+        col = self.columns.index
+        self._interned = frozenset(col(c) for c in _INTERNED if c in self.columns)
+        self._keys = tuple(col(c) for c in ('id', 'fees_per_year', 'is_government', 'country', 'city'))
+        self.records = []
+        self.ids = []
+        self.fees = []
+        self.gov = []
+        self.country_l = []
+        self.city_l = []
+        self.masks = []
+        self.encoded = []
+        # positions[i] is i; shared so every list of positions (or of
+        # ranking offsets) references the same int objects
+        self.positions = []
+        self.pos = {}
+        self._shared = {}
+
+    def copy(self) -> 'CollegeStore':
+        new = CollegeStore(self.columns)
+        for name in ('records', 'ids', 'fees', 'gov', 'country_l', 'city_l', 'masks', 'encoded', 'positions'):
+            getattr(new, name).extend(getattr(self, name))
+        new.pos = dict(self.pos)
+        new._shared = self._shared
+        return new
+
+    def append(self, row: tuple, mask=0) -> int:
+        p = len(self.records)
+        id_i, fees_i, gov_i, country_i, city_i = self._keys
+        values = list(row)
+        for i in self._interned:
+            if isinstance(values[i], str):
+                values[i] = sys.intern(values[i])
+        values[fees_i] = self._shared.setdefault(values[fees_i], values[fees_i])
+        rec = tuple(values)
+        self.records.append(rec)
+        self.ids.append(rec[id_i])
+        self.fees.append(rec[fees_i])
+        self.gov.append(bool(rec[gov_i]))
+        self.country_l.append(sys.intern(rec[country_i].lower()))
+        self.city_l.append(sys.intern(rec[city_i].lower()))
+        self.masks.append(mask)
+        self.encoded.append(None)
+        self.positions.append(p)
+        self.pos[rec[id_i]] = p
+        return p
+
+    @property
+    def dead(self) -> int:
+        return len(self.records) - len(self.pos)
+
+    def row(self, p: int) -> dict:
+        return dict(zip(self.columns, self.records[p]))
+
+    def tuples(self, positions: Sequence[int]) -> List[tuple]:
+        records = self.records
+        return [records[p] for p in positions]
+
+    def rows(self, positions: Sequence[int]) -> List[dict]:
+        return list(map(dict, map(zip, repeat(self.columns), self.tuples(positions))))
+
+    def encode(self, positions: Sequence[int]) -> serialize.Raw:
+        # JSON array of the rows; each record is encoded once, then reused
+        encoded = self.encoded
+        parts = list(map(encoded.__getitem__, positions))
+        if None in parts:
+            records, columns = self.records, self.columns
+            for i, p in enumerate(positions):
+                if parts[i] is None:
+                    # Copied: orjson's bytes keep a ~1 KiB allocation each
+                    parts[i] = encoded[p] = bytes(memoryview(serialize.dumps(dict(zip(columns, records[p])))))
+        return serialize.Raw(b'[' + b','.join(parts) + b']')
+
+
+class Ranking:
+    """Fee-ordered colleges for one (course, country, abroad) combination.
+
+    ``positions`` index the store; ``fees``, ``cities`` and ``gov`` run
+    parallel to it, and ``by_city`` maps a lowercased city to the offsets of
+    its colleges. ``select`` returns store positions.
+    """
+    __slots__ = ('positions', 'fees', 'cities', 'gov', 'by_city')
+
+    def __init__(self, store: CollegeStore, positions: List[int]):
+        self.positions = positions
+        fees, city_l, gov = store.fees, store.city_l, store.gov
+        self.fees = [fees[p] for p in positions]
+        self.cities = [city_l[p] for p in positions]
+        self.gov = [gov[p] for p in positions]
+        self.by_city = {}
+        for i, city in zip(store.positions, self.cities):
+            self.by_city.setdefault(city, []).append(i)
+
+    def select(self, city_l, budget, include_private=True, include_government=True) -> List[int]:
+        cut = bisect_right(self.fees, budget) if budget else len(self.fees)
+        positions = self.positions
+        local = self.by_city.get(city_l, ())
+        local = local[:bisect_left(local, cut)] if local else ()
+        if include_private and include_government:
+            if not local:
+                return positions[:cut]
+            cities = self.cities
+            return [positions[i] for i in local] + [positions[i] for i in range(cut) if cities[i] != city_l]
+        if not include_private and not include_government:
+            return []
+        gov, cities = self.gov, self.cities
+        want = include_government
+        return ([positions[i] for i in local if gov[i] == want] +
+                [positions[i] for i in range(cut) if gov[i] == want and cities[i] != city_l])
+
+
+_EMPTY_RANKING = Ranking(CollegeStore(('id', 'fees_per_year', 'is_government', 'country', 'city')), [])
+
+
+class CollegeIndex:
+    """Inverted index keyed by course code.
+
+    ``search`` returns the same rows, in the same order, as
+    ``filter_colleges`` over ``SELECT * FROM colleges`` (city matches first,
+    then fee ascending, ties by id) but without the ``city_score`` key. The
+    dicts are built per call; ``search_json`` gives the encoded JSON array.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._state = None
+        self._lock = threading.Lock()
+        # Serializes loads and patches; invalidate never waits on it to bump
+        self._build_lock = threading.Lock()
+
+    def invalidate(self, ids=None):
+        # ids=None drops the index (rebuilt on next use); with ids, only
+        # those colleges are re-read and patched into a copy of the state.
+        # Versioned like tests_engine.QuestionCache: a load or patch that
+        # races with a later invalidation is not kept.
+        with self._lock:
+            self.version += 1
+            if ids is None:
+                self._state = None
+                return
+        with self._build_lock:
+            with self._lock:
+                state, version = self._state, self.version
+            if state is None:
+                return
+            state = self._patch(state, set(ids))
+            with self._lock:
+                # Another change landed meanwhile; let the next reader rebuild
+                self._state = state if self.version == version else None
+
+    @staticmethod
+    def _bit(bits, code):
+        bit = bits.get(code)
+        if bit is None:
+            bit = bits[code] = 1 << len(bits)
+        return bit
+
+    @staticmethod
+    def _codes(bits, mask):
+        return [code for code, bit in bits.items() if mask & bit]
+
+    @staticmethod
+    def _fee_order(store):
+        fees, ids = store.fees, store.ids
+        return lambda p: (fees[p], ids[p])
+
+    def _load(self):
+        with connect() as con:
+            if not con.execute('SELECT 1 FROM college_courses LIMIT 1').fetchone() \
+                    and con.execute('SELECT 1 FROM colleges LIMIT 1').fetchone():
+                rebuild_course_map()
+            cur = con.cursor()
+            cur.row_factory = None
+            cur.execute('SELECT * FROM colleges')
+            store = CollegeStore([d[0] for d in cur.description])
+            for row in cur:
+                store.append(row)
+            cur.execute('SELECT course_code, college_id FROM college_courses')
+            bits = {code: 1 << i for i, code in enumerate(COURSE_LABELS)}
+            masks, pos = store.masks, store.pos
+            for code, cid in cur:
+                p = pos.get(cid)
+                if p is not None:
+                    masks[p] |= self._bit(bits, code)
+        shared = {}
+        store.masks[:] = [shared.setdefault(m, m) for m in masks]
+        by_course = {}
+        lists = {bit: by_course.setdefault(code, []) for code, bit in bits.items()}
+        for p in sorted(store.positions, key=self._fee_order(store)):
+            m = masks[p]
+            while m:
+                low = m & -m
+                lists[low].append(p)
+                m ^= low
+        by_course = {code: lst for code, lst in by_course.items() if lst}
+        return {'store': store, 'bits': bits, 'by_course': by_course,
+                'countries': set(store.country_l), 'rankings': {}}
+
+    def _patch(self, state, ids):
+        # Copy-on-write: readers holding the old state keep a consistent view
+        old_store = state['store']
+        if old_store.dead > len(old_store.pos):
+            return self._load()
+        placeholders = ','.join('?' for _ in ids)
+        with connect() as con:
+            cur = con.cursor()
+            cur.row_factory = None
+            fresh = cur.execute(f'SELECT * FROM colleges WHERE id IN ({placeholders})', tuple(ids)).fetchall()
+            mapping = cur.execute(f'SELECT course_code, college_id FROM college_courses WHERE college_id IN ({placeholders})',
+                                  tuple(ids)).fetchall()
+        store = old_store.copy()
+        bits = dict(state['bits'])
+        by_course = dict(state['by_course'])
+        order = self._fee_order(store)
+        touched = set()
+        copied = set()
+
+        def postings(code):
+            if code not in copied:
+                copied.add(code)
+                by_course[code] = list(by_course.get(code, ()))
+            return by_course[code]
+
+        for cid in ids:
+            p = store.pos.pop(cid, None)
+            if p is None:
+                continue
+            for code in self._codes(bits, store.masks[p]):
+                touched.add(code)
+                lst = postings(code)
+                lst.remove(p)
+                if not lst:
+                    del by_course[code]
+                    copied.discard(code)
+        masks = {}
+        for code, cid in mapping:
+            masks[cid] = masks.get(cid, 0) | self._bit(bits, code)
+        added = set()
+        id_i = store.columns.index('id')
+        for row in fresh:
+            p = store.append(row, masks.get(row[id_i], 0))
+            added.add(store.country_l[p])
+            for code in self._codes(bits, store.masks[p]):
+                touched.add(code)
+                insort(postings(code), p, key=order)
+        # Rankings of untouched courses carry over; the rest rematerialize on use
+        # Readers add to the memo without a lock; copy it before filtering
+        rankings = {k: v for k, v in list(state['rankings'].items()) if k[0] not in touched}
+        return {'store': store, 'bits': bits, 'by_course': by_course,
+                'countries': state['countries'] | added,
+                'rankings': rankings}
+
+    def state(self):
+        state = self._state
+        if state is None:
+            with self._build_lock:
+                with self._lock:
+                    state, version = self._state, self.version
+                if state is None:
+                    state = self._load()
+                    with self._lock:
+                        if self.version == version:
+                            self._state = state
+        return state
+
+    def get(self, college_id: int) -> Optional[dict]:
+        store = self.state()['store']
+        p = store.pos.get(college_id)
+        return store.row(p) if p is not None else None
+
+    def ranking(self, course_code: str, country_l: str, abroad: bool, state=None) -> Ranking:
+        state = state or self.state()
+        if abroad and country_l not in state['countries']:
+            # Nothing to exclude: same list as the whole course
+            country_l = None
+        key = (course_code, country_l, abroad)
+        ranking = state['rankings'].get(key)
+        if ranking is None:
+            store = state['store']
+            postings = state['by_course'].get(course_code, ())
+            if abroad and country_l is None:
+                positions = postings
+            else:
+                countries = store.country_l
+                positions = [p for p in postings if (countries[p] == country_l) != abroad]
+            if not positions:
+                return _EMPTY_RANKING
+            ranking = state['rankings'][key] = Ranking(store, positions)
+        return ranking
+
+    def _select(self, course_code, city, country, abroad, budget, include_private, include_government):
+        state = self.state()
+        ranking = self.ranking(course_code, (country or '').lower(), abroad, state)
+        return state['store'], ranking.select((city or '').lower(), budget, include_private, include_government)
+
+    def search(self, course_code: str, city: str, country: str, abroad: bool, budget: int,
+               include_private=True, include_government=True) -> List[dict]:
+        store, positions = self._select(course_code, city, country, abroad, budget, include_private, include_government)
+        return store.rows(positions)
+
+    def search_json(self, course_code: str, city: str, country: str, abroad: bool, budget: int,
+                    include_private=True, include_government=True) -> serialize.Raw:
+        # search() encoded as a JSON array, from the store's per-record JSON
+        store, positions = self._select(course_code, city, country, abroad, budget, include_private, include_government)
+        return store.encode(positions)
+
+    def iter_search(self, course_code: str, city: str, country: str, abroad: bool, budget: int,
+                    include_private=True, include_government=True,
+                    after: Optional[Tuple[int, int, int]] = None) -> Iterator[Tuple[tuple, dict]]:
+        # Lazy form of search(): yields (key, row) in result order, where key
+        # (group, fees, id) is a keyset cursor; pass it back as ``after`` to
+        # resume right behind that row.
+        city_l = (city or '').lower()
+        state = self.state()
+        store = state['store']
+        ranking = self.ranking(course_code, (country or '').lower(), abroad, state)
+        positions, fees, cities, gov, ids = ranking.positions, ranking.fees, ranking.cities, ranking.gov, store.ids
+        for group in (0, 1):
+            start = 0
+            if after is not None:
+                if group < after[0]:
+                    continue
+                if group == after[0]:
+                    start = bisect_right(positions, (after[1], after[2]), key=self._fee_order(store))
+            for i in range(start, len(positions)):
+                if budget and fees[i] > budget:
+                    break
+                if (cities[i] == city_l) == bool(group):
+                    continue
+                if not include_private and not gov[i]:
+                    continue
+                if not include_government and gov[i]:
+                    continue
+                p = positions[i]
+                yield (group, fees[i], ids[p]), store.row(p)
+
+
+college_index = CollegeIndex()
+on_change('colleges', college_index.invalidate)
+
+
+def colleges_changed(ids=None):
+    # Call after writing to colleges: refresh the mapping rows, then the index
+    rebuild_course_map(ids)
+    notify_change('colleges', ids)
@@ -1,41 +1,326 @@
-
+import json
 import os
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
+from functools import wraps
+
+from .metrics import observe_sql
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_FILE = os.path.join(BASE_DIR, 'career.db')
 SCHEMA_FILE = os.path.join(BASE_DIR, 'schema.sql')
 
-@contextmanager
+# Applied once to every pooled connection
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA mmap_size=134217728',
+)
+
+# Compiled statements kept per connection (sqlite3's built-in LRU keyed by SQL text)
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    """One long-lived connection per thread, opened lazily and reused.
+
+    Reusing the connection also reuses its prepared statements, since the
+    helpers below always run the same SQL strings. Nested ``connection()``
+    blocks on one thread share a transaction that commits at the outermost
+    exit and rolls back if it raises.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def _open(self):
+        con = sqlite3.connect(self.path, check_same_thread=False,
+                              cached_statements=STATEMENT_CACHE_SIZE)
+        con.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            con.execute(pragma)
+        return con
+
+    def get(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = self._open()
+            self._local.con = con
+            self._local.depth = 0
+            with self._lock:
+                self._all.append(con)
+        return con
+
+    @contextmanager
+    def connection(self):
+        con = self.get()
+        local = self._local
+        local.depth += 1
+        try:
+            yield con
+            if local.depth == 1:
+                con.commit()
+        except BaseException:
+            if local.depth == 1:
+                con.rollback()
+            raise
+        finally:
+            local.depth -= 1
+
+    def close(self):
+        with self._lock:
+            cons, self._all = self._all, []
+        self._local = threading.local()
+        for con in cons:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != DB_FILE:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_FILE:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(DB_FILE)
+            pool = _pool
+    return pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 def connect():
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    try:
-        yield con
-        con.commit()
-    finally:
-        con.close()
+    return get_pool().connection()
+
+# Columns added after their table first shipped; CREATE TABLE IF NOT EXISTS
+# won't add them to an existing database, so init_db does.
+COLUMN_MIGRATIONS = (
+    ('test_questions', 'difficulty', 'INTEGER'),
+    ('test_sessions', 'question_ids', 'TEXT'),
+)
+
+# Natural keys added after the tables shipped with duplicates allowed
+UNIQUE_INDEXES = (
+    ('uq_colleges_natural', 'colleges', ('name', 'country', 'city')),
+    ('uq_resources_natural', 'resources', ('course_code', 'url')),
+)
 
 def init_db():
     with connect() as con:
         with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
             con.executescript(f.read())
+        for table, column, decl in COLUMN_MIGRATIONS:
+            existing = {r['name'] for r in con.execute(f'PRAGMA table_info({table})')}
+            if column not in existing:
+                con.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+        for name, table, columns in UNIQUE_INDEXES:
+            if con.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,)).fetchone():
+                continue
+            key = ', '.join(columns)
+            # Keep the first row of each key; dependents cascade with the rest
+            removed = con.execute(f'DELETE FROM {table} WHERE id NOT IN '
+                                  f'(SELECT MIN(id) FROM {table} GROUP BY {key})').rowcount
+            if removed:
+                print(f'init_db: removed {removed} duplicate {table} rows before indexing ({key})')
+            con.execute(f'CREATE UNIQUE INDEX {name} ON {table}({key})')
 
 # Helpers
 
+def _timed(fn):
+    # Records call count and duration per helper in backend.metrics
+    name = fn.__name__
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            observe_sql(name, time.perf_counter() - t0)
+    return wrapper
+
+@_timed
 def query_one(sql, params=()):
     with connect() as con:
         cur = con.execute(sql, params)
         row = cur.fetchone()
         return dict(row) if row else None
 
+@_timed
 def query_all(sql, params=()):
     with connect() as con:
         cur = con.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
 
+@_timed
+def query_rows(sql, params=()):
+    # (column names, plain tuples): skips building a dict per row, for
+    # callers that serialize rows straight off the cursor
+    with connect() as con:
+        cur = con.cursor()
+        cur.row_factory = None
+        cur.execute(sql, params)
+        return [d[0] for d in cur.description], cur.fetchall()
+
+@_timed
 def execute(sql, params=()):
     with connect() as con:
         cur = con.execute(sql, params)
         return cur.lastrowid
+
+def iter_query(sql, params=(), batch=256):
+    # Streams rows as dicts straight off the cursor instead of fetchall()
+    with connect() as con:
+        cur = con.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                return
+            for r in rows:
+                yield dict(r)
+
+# Change notifications: in-process caches register for a table and writers
+# announce what they touched (ids=None means "anything may have changed").
+# Each announcement is also appended to change_log, where a ChangeFeed in
+# every other process (prefork workers, a server while ingest runs) picks it
+# up and replays it to that process's listeners.
+
+CHANGE_POLL_INTERVAL = 0.25
+CHANGE_LOG_RETENTION = 3600
+# Larger id lists are logged as a full invalidation
+CHANGE_LOG_MAX_IDS = 10_000
+
+_listeners = {}
+
+def on_change(table, callback):
+    _listeners.setdefault(table, []).append(callback)
+
+def fire_change(table, ids):
+    # Runs this process's listeners only; see notify_change
+    for callback in list(_listeners.get(table, ())):
+        callback(ids)
+
+def log_change(con, table, ids):
+    # Appends to change_log inside the caller's transaction
+    logged = json.dumps(ids) if ids is not None and len(ids) <= CHANGE_LOG_MAX_IDS else None
+    con.execute('INSERT INTO change_log(tbl, ids, pid, at) VALUES(?,?,?,?)',
+                (table, logged, os.getpid(), time.time()))
+
+def notify_change(table, ids=None):
+    if ids is not None:
+        ids = list(ids)
+    with connect() as con:
+        log_change(con, table, ids)
+    fire_change(table, ids)
+
+
+class ChangeFeed:
+    """Replays change_log rows written by other processes to local listeners.
+
+    Polls ``PRAGMA data_version`` on a private connection, which only moves
+    when another connection commits, so an idle database costs one pragma per
+    interval. If rows were pruned before this process saw them, every
+    listener gets a full invalidation instead.
+    """
+
+    def __init__(self, interval=CHANGE_POLL_INTERVAL, retention=CHANGE_LOG_RETENTION):
+        self.interval = interval
+        self.retention = retention
+        self._stop = threading.Event()
+        self._thread = None
+        self._con = None
+        self._version = None
+        self._seq = 0
+        self._pruned_at = 0.0
+
+    def start(self):
+        self._con = sqlite3.connect(DB_FILE, check_same_thread=False)
+        self._con.execute('PRAGMA busy_timeout=5000')
+        self._version = self._con.execute('PRAGMA data_version').fetchone()[0]
+        self._seq = self._con.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+        self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+        self._thread.start()
+
+    def poll(self) -> int:
+        # Returns how many foreign changes were replayed
+        version = self._con.execute('PRAGMA data_version').fetchone()[0]
+        if version == self._version:
+            return 0
+        self._version = version
+        rows = self._con.execute('SELECT seq, tbl, ids, pid FROM change_log WHERE seq>? ORDER BY seq',
+                                 (self._seq,)).fetchall()
+        if not rows:
+            return 0
+        first = self._con.execute('SELECT MIN(seq) FROM change_log').fetchone()[0]
+        missed = first is not None and first > self._seq + 1 and self._seq > 0
+        self._seq = rows[-1][0]
+        if missed:
+            for table in list(_listeners):
+                self._replay(table, None)
+            return len(rows)
+        pid = os.getpid()
+        count = 0
+        for _, table, ids, writer in rows:
+            if writer == pid:
+                continue
+            self._replay(table, ids)
+            count += 1
+        return count
+
+    @staticmethod
+    def _replay(table, ids):
+        # _seq has already moved past this row, so a failing listener must
+        # not lose it: fall back to invalidating the whole table
+        try:
+            fire_change(table, json.loads(ids) if ids is not None else None)
+            return
+        except Exception as e:
+            print(f'change feed: {table} listener failed: {e}')
+        if ids is not None:
+            try:
+                fire_change(table, None)
+            except Exception as e:
+                print(f'change feed: {table} listener failed: {e}')
+
+    def prune(self):
+        with self._con:
+            self._con.execute('DELETE FROM change_log WHERE at<?', (time.time() - self.retention,))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+                if time.time() - self._pruned_at > 60:
+                    self._pruned_at = time.time()
+                    self.prune()
+            except Exception as e:
+                print(f'change feed: {e}')
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._con is not None:
+            self._con.close()
@@ -0,0 +1,9 @@
+"""Exceptions shared across the request path."""
+
+
+class Overloaded(Exception):
+    """A bounded queue is full; the server answers 503 with Retry-After."""
+
+    def __init__(self, retry_after: int, what: str):
+        super().__init__(f'{what} saturated, retry after {retry_after}s')
+        self.retry_after = retry_after
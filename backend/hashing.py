@@ -0,0 +1,119 @@
+"""Password hashing off the request thread.
+
+PBKDF2 at 100k iterations is pure CPU and holds the GIL, so ``HashPool`` can
+run it in a pool of worker processes. Admission is bounded: when
+``max_pending`` hashes are already queued or running, ``hash`` raises
+``Overloaded`` immediately so the server can answer 503 with Retry-After
+instead of queueing without limit. Queue wait and compute time are recorded
+per route.
+"""
+import hashlib
+import hmac
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .errors import Overloaded
+
+ITERATIONS = 100_000
+
+
+def pbkdf2_hash(password: str, salt: bytes) -> str:
+    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, ITERATIONS)
+    return dk.hex()
+
+
+def _timed_hash(password: str, salt: bytes):
+    t0 = time.perf_counter()
+    digest = pbkdf2_hash(password, salt)
+    return digest, time.perf_counter() - t0
+
+
+def _noop():
+    return None
+
+
+class HashPool:
+    """Runs PBKDF2 inline (workers=0) or in ``workers`` processes.
+
+    ``max_pending`` defaults to four hashes per worker; inline mode is
+    unbounded unless it is given.
+    """
+
+    def __init__(self, workers=0, max_pending=None):
+        self.workers = workers
+        if max_pending is None and workers:
+            max_pending = workers * 4
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+        self._executor = None
+        if workers:
+            # spawn: forking a process that already runs server threads can
+            # copy held locks into the child
+            self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            for f in [self._executor.submit(_noop) for _ in range(workers)]:
+                f.result()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, route, wait=None, compute=None, rejected=False):
+        with self._lock:
+            s = self._stats.setdefault(route, {'count': 0, 'rejected': 0, 'wait_seconds': 0.0,
+                                               'compute_seconds': 0.0, 'wait_max': 0.0, 'compute_max': 0.0})
+            if rejected:
+                s['rejected'] += 1
+                return
+            s['count'] += 1
+            s['wait_seconds'] += wait
+            s['compute_seconds'] += compute
+            s['wait_max'] = max(s['wait_max'], wait)
+            s['compute_max'] = max(s['compute_max'], compute)
+
+    def _retry_after(self):
+        with self._lock:
+            done = sum(s['count'] for s in self._stats.values())
+            compute = sum(s['compute_seconds'] for s in self._stats.values())
+        avg = compute / done if done else 0.1
+        return max(1, math.ceil(avg * (self.max_pending or 1) / max(1, self.workers)))
+
+    def hash(self, password: str, salt: bytes, route: str = '') -> str:
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            self._record(route, rejected=True)
+            raise Overloaded(self._retry_after(), 'password hashing')
+        try:
+            t0 = time.perf_counter()
+            if self._executor is not None:
+                digest, compute = self._executor.submit(_timed_hash, password, salt).result()
+            else:
+                digest, compute = _timed_hash(password, salt)
+            self._record(route, max(0.0, time.perf_counter() - t0 - compute), compute)
+            return digest
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def verify(self, password: str, salt: bytes, expected: str, route: str = '') -> bool:
+        return hmac.compare_digest(self.hash(password, salt, route), expected)
+
+    def stats(self):
+        # {route: {count, rejected, wait_seconds, compute_seconds, wait_max, compute_max}}
+        with self._lock:
+            return {route: dict(s) for route, s in self._stats.items()}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hash_pool = HashPool()
+
+
+def configure(workers=0, max_pending=None):
+    global hash_pool
+    old = hash_pool
+    hash_pool = HashPool(workers, max_pending)
+    old.shutdown()
+    return hash_pool
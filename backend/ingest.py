@@ -0,0 +1,294 @@
+"""Bulk, resumable catalog ingestion.
+
+Streams a CSV, validates and normalizes each row, and upserts it in batches
+with ``executemany`` (one transaction per batch). Rows are keyed on their
+natural key (colleges: name+country+city, resources: course_code+url), so
+re-running a load never duplicates anything. Progress is checkpointed in
+``ingest_progress`` inside the same transaction as each batch; an
+interrupted load resumes after the last committed batch.
+
+    python -m backend.ingest colleges path/to/colleges.csv
+
+``sync`` is the incremental counterpart: it diffs a full CSV against the
+current table by per-row content hash, applies only the inserts, updates
+and deletes in one transaction, and tells in-process caches which rows
+changed.
+
+    python -m backend.ingest colleges path/to/colleges.csv --sync
+"""
+import argparse
+import csv
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from .db import connect, init_db, notify_change
+from .colleges import course_codes, rebuild_course_map
+
+BATCH_SIZE = 5000
+MAX_ERRORS_KEPT = 20
+
+
+def _text(row, key, required=False, default=''):
+    value = (row.get(key) or '').strip()
+    if required and not value:
+        raise ValueError(f'missing {key}')
+    return value or default
+
+
+def _int(row, key, default=None):
+    raw = (row.get(key) or '').strip().replace(',', '').replace('_', '')
+    if not raw:
+        if default is None:
+            raise ValueError(f'missing {key}')
+        return default
+    try:
+        return int(float(raw))
+    except ValueError:
+        raise ValueError(f'bad {key}: {raw!r}') from None
+
+
+def normalize_college(row) -> tuple:
+    # Accepts either a single 'courses' column or courses0..courses4
+    courses = [row[f'courses{i}'] for i in range(5) if row.get(f'courses{i}')]
+    codes = course_codes(','.join(courses) or row.get('courses', ''))
+    if not codes:
+        raise ValueError('no courses')
+    fees = _int(row, 'fees_per_year')
+    if fees < 0:
+        raise ValueError('negative fees_per_year')
+    return (
+        _text(row, 'name', required=True),
+        _text(row, 'country', required=True),
+        _text(row, 'city', required=True),
+        1 if _int(row, 'is_government', 0) else 0,
+        ','.join(dict.fromkeys(codes)),
+        fees,
+        _text(row, 'scholarships'),
+        _text(row, 'placements'),
+        _text(row, 'website'),
+    )
+
+
+def normalize_resource(row) -> tuple:
+    course_code = (row.get('course_code') or row.get('CourseCode') or 'UNKNOWN').strip()
+    return (
+        course_code,
+        _text(row, 'title', default='Untitled'),
+        _text(row, 'url'),
+        1 if _int(row, 'is_free', 1) else 0,
+    )
+
+
+@dataclass
+class Spec:
+    table: str
+    columns: Tuple[str, ...]
+    key: Tuple[str, ...]
+    normalize: Callable[[dict], tuple]
+    # Refreshes tables derived from this one for the given ids (None = all);
+    # runs inside the writing transaction
+    derived: Optional[Callable[..., None]] = None
+
+    @property
+    def upsert_sql(self):
+        cols = ', '.join(self.columns)
+        marks = ', '.join('?' for _ in self.columns)
+        updates = ', '.join(f'{c}=excluded.{c}' for c in self.columns if c not in self.key)
+        return (f'INSERT INTO {self.table}({cols}) VALUES({marks}) '
+                f'ON CONFLICT({", ".join(self.key)}) DO UPDATE SET {updates}')
+
+
+SPECS = {
+    'colleges': Spec(
+        'colleges',
+        ('name', 'country', 'city', 'is_government', 'courses', 'fees_per_year', 'scholarships', 'placements', 'website'),
+        ('name', 'country', 'city'),
+        normalize_college,
+        rebuild_course_map,
+    ),
+    'resources': Spec(
+        'resources',
+        ('course_code', 'title', 'url', 'is_free'),
+        ('course_code', 'url'),
+        normalize_resource,
+    ),
+}
+
+
+@dataclass
+class LoadReport:
+    kind: str
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_skipped: int = 0
+    rows_resumed: int = 0
+    seconds: float = 0.0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f'{self.kind}: {self.rows_written} written, {self.rows_skipped} skipped, '
+                f'{self.rows_resumed} resumed past, {self.rows_read} read in {self.seconds:.2f}s '
+                f'({self.rows_per_sec:,.0f} rows/s)')
+
+
+def _source_id(kind, path):
+    # A checkpoint is only valid for the exact same file
+    st = os.stat(path)
+    return f'{kind}:{os.path.abspath(path)}:{st.st_size}:{int(st.st_mtime)}'
+
+
+def load(kind: str, path: str, batch_size=BATCH_SIZE, resume=True) -> LoadReport:
+    spec = SPECS[kind]
+    report = LoadReport(kind)
+    source = _source_id(kind, path)
+    t0 = time.perf_counter()
+
+    done = 0
+    if resume:
+        with connect() as con:
+            row = con.execute('SELECT rows_done FROM ingest_progress WHERE source=?', (source,)).fetchone()
+        done = row['rows_done'] if row else 0
+    report.rows_resumed = done
+
+    def flush(batch, position):
+        with connect() as con:
+            if batch:
+                con.executemany(spec.upsert_sql, batch)
+            con.execute('INSERT INTO ingest_progress(source, rows_done) VALUES(?,?) '
+                        'ON CONFLICT(source) DO UPDATE SET rows_done=excluded.rows_done, '
+                        'updated_at=CURRENT_TIMESTAMP', (source, position))
+        report.rows_written += len(batch)
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        batch = []
+        position = 0
+        for position, row in enumerate(csv.DictReader(f), 1):
+            if position <= done:
+                continue
+            report.rows_read += 1
+            try:
+                batch.append(spec.normalize(row))
+            except ValueError as e:
+                report.rows_skipped += 1
+                if len(report.errors) < MAX_ERRORS_KEPT:
+                    report.errors.append((position + 1, str(e)))  # +1 for the header line
+                continue
+            if len(batch) >= batch_size:
+                flush(batch, position)
+                batch = []
+        flush(batch, position)
+
+    with connect() as con:
+        con.execute('DELETE FROM ingest_progress WHERE source=?', (source,))
+        if spec.derived:
+            spec.derived(None)
+    notify_change(spec.table)
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def row_hash(values) -> str:
+    return hashlib.blake2b('\x1f'.join(map(str, values)).encode('utf-8'), digest_size=16).hexdigest()
+
+
+@dataclass
+class SyncReport:
+    kind: str
+    inserted: List[int] = field(default_factory=list)
+    updated: List[int] = field(default_factory=list)
+    deleted: List[int] = field(default_factory=list)
+    unchanged: int = 0
+    rows_skipped: int = 0
+    seconds: float = 0.0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def changed_ids(self):
+        return self.inserted + self.updated + self.deleted
+
+    def __str__(self):
+        return (f'{self.kind}: +{len(self.inserted)} ~{len(self.updated)} -{len(self.deleted)} '
+                f'({self.unchanged} unchanged, {self.rows_skipped} skipped) in {self.seconds:.2f}s')
+
+
+def sync(kind: str, path: str, delete=True) -> SyncReport:
+    spec = SPECS[kind]
+    report = SyncReport(kind)
+    t0 = time.perf_counter()
+    key_width = len(spec.key)
+    key_pos = [spec.columns.index(k) for k in spec.key]
+
+    incoming = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for position, row in enumerate(csv.DictReader(f), 2):
+            try:
+                values = spec.normalize(row)
+            except ValueError as e:
+                report.rows_skipped += 1
+                if len(report.errors) < MAX_ERRORS_KEPT:
+                    report.errors.append((position, str(e)))
+                continue
+            incoming[tuple(values[i] for i in key_pos)] = values
+
+    cols = ', '.join(spec.columns)
+    sets = ', '.join(f'{c}=?' for c in spec.columns)
+    insert_sql = f'INSERT INTO {spec.table}({cols}) VALUES({", ".join("?" for _ in spec.columns)}) RETURNING id'
+    with connect() as con:
+        current = {}
+        for r in con.execute(f'SELECT id, {", ".join(spec.key)}, {cols} FROM {spec.table}'):
+            current[tuple(r[1:1 + key_width])] = (r[0], row_hash(tuple(r[1 + key_width:])))
+
+        updates = []
+        for key, values in incoming.items():
+            existing = current.get(key)
+            if existing is None:
+                report.inserted.append(con.execute(insert_sql, values).fetchone()[0])
+            elif existing[1] != row_hash(values):
+                updates.append(values + (existing[0],))
+                report.updated.append(existing[0])
+            else:
+                report.unchanged += 1
+        con.executemany(f'UPDATE {spec.table} SET {sets} WHERE id=?', updates)
+        if delete:
+            report.deleted = [cid for key, (cid, _) in current.items() if key not in incoming]
+            con.executemany(f'DELETE FROM {spec.table} WHERE id=?', [(cid,) for cid in report.deleted])
+        if spec.derived and report.changed_ids:
+            spec.derived(report.changed_ids)
+
+    if report.changed_ids:
+        notify_change(spec.table, report.changed_ids)
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def load_colleges(path, **kwargs) -> LoadReport:
+    return load('colleges', path, **kwargs)
+
+
+def load_resources(path, **kwargs) -> LoadReport:
+    return load('resources', path, **kwargs)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Bulk-load a colleges or resources CSV')
+    ap.add_argument('kind', choices=sorted(SPECS))
+    ap.add_argument('path')
+    ap.add_argument('--batch', type=int, default=BATCH_SIZE)
+    ap.add_argument('--no-resume', action='store_true', help='ignore any saved checkpoint')
+    ap.add_argument('--sync', action='store_true', help='apply only the differences against the current table')
+    args = ap.parse_args()
+    init_db()
+    if args.sync:
+        result = sync(args.kind, args.path)
+    else:
+        result = load(args.kind, args.path, args.batch, not args.no_resume)
+    print(result)
+    for line, err in result.errors:
+        print(f'  line {line}: {err}')
@@ -1,5 +1,11 @@
 
-from typing import Dict, List, Tuple
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: batch scoring falls back to pure Python
+    np = None
 
 # Map streams and traits to suggested course codes
 STREAM_TO_COURSES = {
@@ -57,43 +63,219 @@ def pick_personality(traits: Dict[str, int]) -> str:
     return max(traits.items(), key=lambda t: t[1])[0]
 
 
+_COURSE_CODES = list(COURSE_DIFFICULTY)
+_COURSE_INDEX = {code: i for i, code in enumerate(_COURSE_CODES)}
+
+
+def _course_rank(code: str):
+    # Known courses in COURSE_DIFFICULTY order, anything else after them
+    return (_COURSE_INDEX.get(code, len(_COURSE_INDEX)), code)
+
+
+# Scoring weights. The defaults are the original hand-tuned constants;
+# ``ml_train --train`` fits new ones from recorded course choices and saves
+# them as a versioned artifact (see backend/weights.py).
+WEIGHTS_FORMAT = 1
+DEFAULT_WEIGHTS = {
+    'base': 50,
+    'aptitude': 1.5,
+    'academics': 1.2,
+    'personality_boost': 8,
+    'dream_bonus': 10,
+    'course_bias': {},
+}
+
+
+class ScoringModel:
+    """Weights compiled for ``recommend_courses``.
+
+    Per-course offsets and biases sit in arrays indexed like _COURSE_CODES,
+    and the candidate list for every (stream, personality) pair is built and
+    sorted once here instead of on every call.
+    """
+    __slots__ = ('version', 'weights', 'base', 'aptitude', 'academics', 'personality_boost',
+                 'dream_bonus', 'offset', 'bias', 'difficulty', 'boosted', 'candidates')
+
+    def __init__(self, weights=None, version='default'):
+        w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.version = version
+        self.weights = w
+        self.base = w['base']
+        self.aptitude = w['aptitude']
+        self.academics = w['academics']
+        self.personality_boost = w['personality_boost']
+        self.dream_bonus = w['dream_bonus']
+        self.offset = array('d', [(COURSE_DIFFICULTY[c] - 60) / 4 for c in _COURSE_CODES])
+        self.bias = array('d', [float(w['course_bias'].get(c, 0.0)) for c in _COURSE_CODES])
+        self.difficulty = array('l', [COURSE_DIFFICULTY[c] for c in _COURSE_CODES])
+        self.boosted = {t: frozenset(_COURSE_INDEX[c] for c in codes)
+                        for t, codes in PERSONALITY_TO_COURSES.items()}
+        self.candidates = {}
+        for stream in list(STREAM_TO_COURSES) + [None]:
+            for ptype in list(PERSONALITY_TO_COURSES) + [None]:
+                codes = set(STREAM_TO_COURSES.get(stream, ())) | set(PERSONALITY_TO_COURSES.get(ptype, ()))
+                self.candidates[stream, ptype] = tuple(sorted(_COURSE_INDEX[c] for c in codes))
+
+    def candidate_codes(self, stream, personality_type, dream_course=None) -> List[str]:
+        # Same candidate set and order recommend_courses scores
+        stream = stream if stream in STREAM_TO_COURSES else None
+        ptype = personality_type if personality_type in PERSONALITY_TO_COURSES else None
+        codes = [_COURSE_CODES[i] for i in self.candidates[stream, ptype]]
+        if dream_course and dream_course not in codes:
+            codes.append(dream_course)
+            codes.sort(key=_course_rank)
+        return codes
+
+
+_model = ScoringModel()
+
+
+def current_model() -> ScoringModel:
+    return _model
+
+
+def set_model(model: ScoringModel):
+    # A single reference swap: in-flight calls finish on the model they read
+    global _model
+    _model = model
+
+
 def recommend_courses(stream: str, board_marks: float, aptitude_score20: int,
-                      personality_type: str, dream_course: str | None) -> List[Tuple[str, int]]:
-    candidates = set()
-    # Seed by stream
-    if stream in STREAM_TO_COURSES:
-        candidates.update(STREAM_TO_COURSES[stream])
-    # Seed by personality
-    if personality_type in PERSONALITY_TO_COURSES:
-        candidates.update(PERSONALITY_TO_COURSES[personality_type])
-    # Include dream course if any
-    if dream_course:
-        candidates.add(dream_course)
+                      personality_type: str, dream_course: str | None,
+                      model: Optional[ScoringModel] = None) -> List[Tuple[str, int]]:
+    m = model or _model
+    # Candidates: courses seeded by stream and personality, plus the dream course
+    indexes = m.candidates[stream if stream in STREAM_TO_COURSES else None,
+                           personality_type if personality_type in PERSONALITY_TO_COURSES else None]
+    dream_i = _COURSE_INDEX.get(dream_course, -1) if dream_course else -1
+    extra = None
+    if dream_i >= 0:
+        if dream_i not in indexes:
+            indexes = tuple(sorted(indexes + (dream_i,)))
+    elif dream_course:
+        # Unknown course codes score at difficulty 60 and sort after known ones
+        extra = dream_course
 
     # Academic strength on 0-20
     academics20 = normalize_score(board_marks)
+    boosted = m.boosted.get(personality_type, ()) if personality_type in PERSONALITY_TO_COURSES else ()
+    offset, bias, difficulty = m.offset, m.bias, m.difficulty
 
-    # Composite score per course
+    # Composite score per course (fixed iteration order keeps ties stable)
     results = []
-    for code in candidates:
-        diff = COURSE_DIFFICULTY.get(code, 60)
+    for i in indexes:
+        off = offset[i]
         # Base fit: higher if aptitude and academics meet difficulty
-        fit = 50
-        fit += (aptitude_score20 - (diff - 60) / 4) * 1.5
-        fit += (academics20 - (diff - 60) / 4) * 1.2
+        fit = m.base
+        fit += (aptitude_score20 - off) * m.aptitude
+        fit += (academics20 - off) * m.academics
         # Personality boost if course in personality list
-        if personality_type in PERSONALITY_TO_COURSES and code in PERSONALITY_TO_COURSES[personality_type]:
-            fit += 8
+        if i in boosted:
+            fit += m.personality_boost
         # Dream course bonus
-        if dream_course == code:
-            fit += 10
+        if i == dream_i:
+            fit += m.dream_bonus
+        fit += bias[i]
         # Clamp 0-100
-        fit = int(max(0, min(100, round(fit))))
-        results.append((code, fit))
+        results.append((_COURSE_CODES[i], int(max(0, min(100, round(fit)))), difficulty[i]))
+    if extra is not None:
+        fit = m.base
+        fit += aptitude_score20 * m.aptitude
+        fit += academics20 * m.academics
+        fit += m.dream_bonus
+        results.append((extra, int(max(0, min(100, round(fit)))), 60))
 
     # Sort by fit desc, then by difficulty asc
-    results.sort(key=lambda x: (-x[1], COURSE_DIFFICULTY.get(x[0], 60)))
-    return results[:6]
+    results.sort(key=lambda x: (-x[1], x[2]))
+    return [(code, fit) for code, fit, _ in results[:6]]
+
+
+Profile = Tuple[str, float, int, str, Optional[str]]
+
+
+def recommend_courses_batch(profiles: Iterable[Profile], use_numpy: Optional[bool] = None,
+                            model: Optional[ScoringModel] = None) -> List[List[Tuple[str, int]]]:
+    # profiles: (stream, board_marks, aptitude_score20, personality_type, dream_course)
+    # tuples, i.e. recommend_courses' arguments. Returns one result list per
+    # profile, identical to calling recommend_courses on each.
+    profiles = list(profiles)
+    m = model or _model
+    if use_numpy is None:
+        use_numpy = np is not None
+    if not use_numpy or not profiles:
+        return [recommend_courses(*p, model=m) for p in profiles]
+    return _recommend_numpy(profiles, m)
+
+
+def _recommend_numpy(profiles: List[Profile], m: ScoringModel) -> List[List[Tuple[str, int]]]:
+    # Scores every profile against every course column as one N x K array.
+    # Arithmetic runs in the same order as recommend_courses so the float
+    # results (and therefore the rounding) are bit-identical.
+    codes = list(_COURSE_CODES)
+    index = dict(_COURSE_INDEX)
+    for p in profiles:
+        dream = p[4]
+        if dream and dream not in index:
+            index[dream] = len(codes)
+            codes.append(dream)
+    k = len(codes)
+    streams = list(STREAM_TO_COURSES)
+    types = list(PERSONALITY_TO_COURSES)
+    # Row 0 of each lookup table is "unknown stream / personality"
+    stream_seed = np.zeros((len(streams) + 1, k), dtype=bool)
+    for i, s in enumerate(streams, 1):
+        stream_seed[i, [index[c] for c in STREAM_TO_COURSES[s]]] = True
+    personality_seed = np.zeros((len(types) + 1, k), dtype=bool)
+    for i, t in enumerate(types, 1):
+        personality_seed[i, [index[c] for c in PERSONALITY_TO_COURSES[t]]] = True
+    stream_pos = {s: i for i, s in enumerate(streams, 1)}
+    type_pos = {t: i for i, t in enumerate(types, 1)}
+
+    n = len(profiles)
+    stream_idx = np.empty(n, dtype=np.intp)
+    type_idx = np.empty(n, dtype=np.intp)
+    dream_idx = np.full(n, -1, dtype=np.intp)
+    marks = np.empty(n, dtype=np.float64)
+    aptitude = np.empty(n, dtype=np.float64)
+    for row, (stream, board_marks, aptitude20, personality_type, dream) in enumerate(profiles):
+        stream_idx[row] = stream_pos.get(stream, 0)
+        type_idx[row] = type_pos.get(personality_type, 0)
+        if dream:
+            dream_idx[row] = index[dream]
+        try:
+            marks[row] = max(0.0, min(100.0, float(board_marks)))
+        except Exception:
+            marks[row] = 0.0
+        aptitude[row] = aptitude20
+
+    extra = k - len(_COURSE_CODES)
+    offset = np.concatenate([np.frombuffer(m.offset, dtype=np.float64), np.zeros(extra)])
+    bias = np.concatenate([np.frombuffer(m.bias, dtype=np.float64), np.zeros(extra)])
+    difficulty = np.array([COURSE_DIFFICULTY.get(c, 60) for c in codes])
+    academics = np.rint(marks * 0.2)
+
+    boosted = personality_seed[type_idx]
+    dream_hit = np.zeros((n, k), dtype=bool)
+    has_dream = dream_idx >= 0
+    dream_hit[np.nonzero(has_dream)[0], dream_idx[has_dream]] = True
+    candidate = stream_seed[stream_idx] | boosted | dream_hit
+
+    fit = m.base + (aptitude[:, None] - offset) * m.aptitude
+    fit = fit + (academics[:, None] - offset) * m.academics
+    fit = fit + np.where(boosted, m.personality_boost, 0)
+    fit = fit + np.where(dream_hit, m.dream_bonus, 0)
+    fit = fit + bias
+    fit = np.clip(np.rint(fit), 0, 100).astype(np.int64)
+
+    # Non-candidates sort last; ties fall back to difficulty, then column order
+    sort_fit = np.where(candidate, -fit, 1)
+    order = np.lexsort((np.broadcast_to(np.arange(k), (n, k)),
+                        np.broadcast_to(difficulty, (n, k)), sort_fit), axis=-1)[:, :6]
+    top_fit = np.take_along_axis(fit, order, axis=1).tolist()
+    top_ok = np.take_along_axis(candidate, order, axis=1).tolist()
+    order = order.tolist()
+    return [[(codes[c], f) for c, f, ok in zip(cols, fits, oks) if ok]
+            for cols, fits, oks in zip(order, top_fit, top_ok)]
 
 
 def filter_colleges(all_colleges: List[dict], selected_course: str, city: str, country: str,
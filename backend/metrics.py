@@ -0,0 +1,214 @@
+"""Request-level instrumentation, exposed in Prometheus text format.
+
+Histograms for route latency, db helper calls and JSON encode/decode, plus
+an opt-in profiler that keeps cProfile stats for the slowest N requests.
+Everything here is in-process and lock-protected; ``render()`` produces the
+``/api/_metrics`` body.
+"""
+import cProfile
+import heapq
+import itertools
+import os
+import pstats
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+_collectors = []
+_local = threading.local()
+
+
+def _fmt_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                    for k, v in pairs)
+    return '{' + body + '}'
+
+
+def _fmt_num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            lines.append(f'{self.name}{_fmt_labels(self.labels, labels)} {_fmt_num(v)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def count(self, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += n
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_fmt_labels(self.labels, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_fmt_labels(self.labels, labels)} {_fmt_num(series[-1])}')
+            lines.append(f'{self.name}_count{_fmt_labels(self.labels, labels)} {cumulative}')
+        return lines
+
+
+def collector(fn):
+    # fn() returns extra exposition lines (for stats kept elsewhere)
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> bytes:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for fn in _collectors:
+        lines.extend(fn())
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+request_seconds = Histogram('careerpath_request_seconds', 'HTTP request latency by route', ('method', 'route'))
+responses = Counter('careerpath_responses_total', 'HTTP responses by route and status', ('method', 'route', 'status'))
+sql_seconds = Histogram('careerpath_sql_seconds', 'Time spent in backend.db helpers', ('helper',))
+sql_queries = Counter('careerpath_sql_queries_total', 'db helper calls attributed to the route being served', ('route',))
+json_seconds = Histogram('careerpath_json_seconds', 'JSON encode/decode time', ('op',))
+
+
+def set_route(route):
+    _local.route = route
+
+
+def observe_sql(helper, seconds):
+    sql_seconds.observe(seconds, helper)
+    sql_queries.inc(getattr(_local, 'route', None) or 'none')
+
+
+class timed:
+    # with timed(json_seconds, 'encode'): ...
+    __slots__ = ('hist', 'labels', 't0')
+
+    def __init__(self, hist, *labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, *self.labels)
+        return False
+
+
+class SlowestProfiler:
+    """Profiles every request and keeps pstats for the slowest ``n``.
+
+    This is expensive (cProfile on every request) and meant for a staging
+    box or a short window in production. ``dump()`` writes one ``.prof``
+    file per kept request, slowest first, readable with ``pstats``.
+    """
+
+    def __init__(self, n=10, out_dir='profiles'):
+        self.n = n
+        self.out_dir = out_dir
+        self._heap = []  # (seconds, seq, label, stats)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+
+    def finish(self, prof, seconds, label):
+        prof.disable()
+        with self._lock:
+            if len(self._heap) >= self.n and seconds <= self._heap[0][0]:
+                return
+        stats = pstats.Stats(prof)
+        with self._lock:
+            item = (seconds, next(self._seq), label, stats)
+            if len(self._heap) < self.n:
+                heapq.heappush(self._heap, item)
+            else:
+                heapq.heappushpop(self._heap, item)
+
+    def slowest(self):
+        with self._lock:
+            return sorted(self._heap, reverse=True)
+
+    def dump(self):
+        items = self.slowest()
+        if not items:
+            return []
+        os.makedirs(self.out_dir, exist_ok=True)
+        paths = []
+        for rank, (seconds, _, label, stats) in enumerate(items, 1):
+            safe = label.strip('/').replace('/', '_') or 'root'
+            path = os.path.join(self.out_dir, f'{rank:02d}-{safe}-{seconds * 1000:.1f}ms.prof')
+            stats.dump_stats(path)
+            paths.append(path)
+        return paths
+
+
+profiler = None
+
+
+def enable_profiler(n=10, out_dir='profiles'):
+    global profiler
+    profiler = SlowestProfiler(n, out_dir)
+    return profiler
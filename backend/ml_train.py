@@ -1,49 +1,40 @@
 """"
 Simple trainer: loads CSVs (colleges/resources) & seeds DB.
-Also, you can extend with your own dataset mapping stream+marks to course codes.
-No third-party packages used.
+With --train, fits the recommend_courses scoring weights to the courses
+users went on to explore (course_choices) and writes a versioned weights
+artifact the server hot-reloads. Pure Python; NumPy speeds up training when
+installed.
 """
-import csv
-import json
+import argparse
+import math
 import os
-from datetime import datetime, timedelta
-from .db import init_db, execute, query_all
+from .db import init_db, query_all
 from .tests_engine import seed_questions_if_empty
+from .ingest import load_colleges, load_resources, sync
+from .logic import COURSE_DIFFICULTY, DEFAULT_WEIGHTS, PERSONALITY_TO_COURSES, ScoringModel, normalize_score
+from .recommendations import aptitude20_from, personality_from
+from . import weights as weights_artifact
+
+try:
+    import numpy as np
+except ImportError:  # optional: training falls back to pure Python
+    np = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SAMPLE_DIR = os.path.join(BASE_DIR, 'sample_data')
 
 
 def seed_colleges():
-    path = os.path.join(SAMPLE_DIR, 'colleges.csv')
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            courses = [row[f'courses{i}'] for i in range(5) if f'courses{i}' in row and row[f'courses{i}']]
-            courses_str = ",".join(courses)
-
-            execute("""
-                INSERT INTO colleges
-                (name, country, city, is_government, courses, fees_per_year, scholarships, placements, website)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row['name'], row['country'], row['city'], int(row['is_government']),
-                courses_str, int(row['fees_per_year']), row['scholarships'], row['placements'], row['website']
-            ))
+    return load_colleges(os.path.join(SAMPLE_DIR, 'colleges.csv'))
 
 def seed_resources():
-    with open(os.path.join(BASE_DIR, "sample_data", "resources.csv"), "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            course_code = row.get("course_code") or row.get("CourseCode") or "UNKNOWN"
-            title = row.get("title") or "Untitled"
-            url = row.get("url") or ""
-            is_free = int(row.get("is_free", "1"))
+    return load_resources(os.path.join(SAMPLE_DIR, 'resources.csv'))
+
 
-            execute(
-                "INSERT INTO resources (course_code, title, url, is_free) VALUES (?,?,?,?)",
-                (course_code, title, url, is_free),
-            )
+def sync_catalogs(colleges_csv=None, resources_csv=None):
+    # Incremental refresh: apply only the rows that differ from the DB
+    print(sync('colleges', colleges_csv or os.path.join(SAMPLE_DIR, 'colleges.csv')))
+    print(sync('resources', resources_csv or os.path.join(SAMPLE_DIR, 'resources.csv')))
 
 
 def run():
@@ -54,11 +45,200 @@ def run():
     # Only seed colleges/resources if empty
     if query_all('SELECT COUNT(1) as n FROM colleges')[0]['n'] == 0:
         print('Seeding colleges...')
-        seed_colleges()
+        print(seed_colleges())
     if query_all('SELECT COUNT(1) as n FROM resources')[0]['n'] == 0:
         print('Seeding resources...')
-        seed_resources()
+        print(seed_resources())
     print('Done.')
 
+# ---------- Scoring-weight training ----------
+
+TRAINING_SQL = '''
+SELECT c.course_code, p.stream, p.board_marks, p.dream_course,
+       c.apt_session_id, a.total_marks AS apt_total, a.result_json AS apt_result,
+       c.per_session_id, s.result_json AS per_result
+FROM course_choices c
+JOIN profiles p ON p.id = c.profile_id
+LEFT JOIN test_sessions a ON a.id = c.apt_session_id
+LEFT JOIN test_sessions s ON s.id = c.per_session_id
+ORDER BY c.id
+'''
+
+# The model is a softmax over each user's candidate courses with logits
+# fit / FIT_SCALE, so a 10-point fit gap means e times likelier to be picked
+FIT_SCALE = 10.0
+TRAINED = ('aptitude', 'academics', 'personality_boost', 'dream_bonus')
+MIN_SAMPLES = 50
+
+
+def training_examples(rows):
+    # Rebuilds the inputs recommend_courses saw for each choice (same
+    # defaults as recommendations.compute). Returns (examples, skipped), an
+    # example being (candidate codes, feature rows, chosen position);
+    # choices outside the candidate set can't be learned from and are skipped.
+    model = ScoringModel()
+    examples, skipped = [], 0
+    for r in rows:
+        aptitude20 = aptitude20_from(r['apt_total'], r['apt_result']) if r['apt_session_id'] is not None else 0
+        personality_type = personality_from(r['per_result']) if r['per_session_id'] is not None else 'Analytical'
+        dream = r['dream_course']
+        codes = model.candidate_codes(r['stream'], personality_type, dream)
+        if r['course_code'] not in codes:
+            skipped += 1
+            continue
+        academics20 = normalize_score(r['board_marks'] or 0)
+        boosted = set(PERSONALITY_TO_COURSES.get(personality_type, ()))
+        feats = []
+        for code in codes:
+            off = (COURSE_DIFFICULTY.get(code, 60) - 60) / 4
+            feats.append((aptitude20 - off, academics20 - off, float(code in boosted), float(code == dream)))
+        examples.append((codes, feats, codes.index(r['course_code'])))
+    return examples, skipped
+
+
+def _objective_python(examples, theta, bias_index):
+    # Mean negative log-likelihood and its gradient w.r.t. theta (fit units)
+    k = len(TRAINED)
+    grad = [0.0] * len(theta)
+    loss = 0.0
+    hits = 0
+    for codes, feats, chosen in examples:
+        logits = []
+        for code, x in zip(codes, feats):
+            z = sum(theta[j] * x[j] for j in range(k))
+            i = bias_index.get(code)
+            if i is not None:
+                z += theta[i]
+            logits.append(z / FIT_SCALE)
+        top = max(logits)
+        exps = [math.exp(z - top) for z in logits]
+        total = sum(exps)
+        loss += math.log(total) + top - logits[chosen]
+        hits += logits.index(top) == chosen
+        for pos, (code, x) in enumerate(zip(codes, feats)):
+            coef = (exps[pos] / total - (pos == chosen)) / FIT_SCALE
+            for j in range(k):
+                grad[j] += coef * x[j]
+            i = bias_index.get(code)
+            if i is not None:
+                grad[i] += coef
+    n = len(examples)
+    return loss / n, [g / n for g in grad], hits / n
+
+
+class _NumpyObjective:
+    # Same objective over padded (examples x candidates) arrays
+    def __init__(self, examples, bias_index):
+        n = len(examples)
+        width = max(len(codes) for codes, _, _ in examples)
+        k = len(TRAINED)
+        self.n_params = k + len(bias_index)
+        self.x = np.zeros((n, width, k))
+        # Column n_params is a dummy slot for courses without a bias weight
+        self.slot = np.full((n, width), self.n_params, dtype=np.intp)
+        self.mask = np.zeros((n, width), dtype=bool)
+        self.chosen = np.zeros((n, width))
+        for row, (codes, feats, chosen) in enumerate(examples):
+            self.x[row, :len(feats)] = feats
+            self.slot[row, :len(codes)] = [bias_index.get(c, self.n_params) for c in codes]
+            self.mask[row, :len(codes)] = True
+            self.chosen[row, chosen] = 1.0
+
+    def __call__(self, theta):
+        k = len(TRAINED)
+        full = np.append(np.asarray(theta), 0.0)
+        z = (self.x @ full[:k] + full[self.slot]) / FIT_SCALE
+        z = np.where(self.mask, z, -np.inf)
+        top = z.max(axis=1, keepdims=True)
+        exps = np.exp(z - top)
+        total = exps.sum(axis=1, keepdims=True)
+        n = len(z)
+        picked = (np.where(self.mask, z, 0.0) * self.chosen).sum(axis=1)
+        loss = float((np.log(total[:, 0]) + top[:, 0] - picked).mean())
+        hits = float((z.argmax(axis=1) == self.chosen.argmax(axis=1)).mean())
+        coef = (exps / total - self.chosen) / FIT_SCALE / n
+        grad = np.zeros(self.n_params + 1)
+        grad[:k] = np.einsum('ij,ijk->k', coef, self.x)
+        grad += np.bincount(self.slot.ravel(), weights=coef.ravel(), minlength=self.n_params + 1)
+        return loss, grad[:-1].tolist(), hits
+
+
+def fit_weights(examples, prior=None, l2=10.0, iterations=400, lr=0.05, use_numpy=None):
+    """Fits TRAINED scalars and per-course biases by maximum likelihood.
+
+    Starts from ``prior`` (the defaults if None) and is pulled back toward it
+    by an L2 penalty worth ``l2`` pseudo-examples, so sparse data moves the
+    weights only a little. Returns (weights, stats).
+    """
+    prior = dict(DEFAULT_WEIGHTS, **(prior or {}))
+    codes = list(COURSE_DIFFICULTY)
+    bias_index = {code: len(TRAINED) + i for i, code in enumerate(codes)}
+    theta0 = [float(prior[name]) for name in TRAINED] + [float(prior['course_bias'].get(c, 0.0)) for c in codes]
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        objective = _NumpyObjective(examples, bias_index)
+    else:
+        objective = lambda theta: _objective_python(examples, theta, bias_index)
+    n = len(examples)
+    penalty = l2 / n / FIT_SCALE ** 2
+
+    start_loss, _, start_hits = objective(theta0)
+    # Adam: the scalars and biases sit on very different scales
+    theta = list(theta0)
+    m = [0.0] * len(theta)
+    v = [0.0] * len(theta)
+    b1, b2, eps = 0.9, 0.999, 1e-8
+    # lr is in logit units; the parameters are in fit points
+    step = lr * FIT_SCALE
+    for t in range(1, iterations + 1):
+        _, grad, _ = objective(theta)
+        for j, g in enumerate(grad):
+            g += penalty * (theta[j] - theta0[j])
+            m[j] = b1 * m[j] + (1 - b1) * g
+            v[j] = b2 * v[j] + (1 - b2) * g * g
+            theta[j] -= step * (m[j] / (1 - b1 ** t)) / (math.sqrt(v[j] / (1 - b2 ** t)) + eps)
+    loss, _, hits = objective(theta)
+
+    fitted = dict(prior)
+    for j, name in enumerate(TRAINED):
+        fitted[name] = round(theta[j], 4)
+    fitted['course_bias'] = {c: round(theta[bias_index[c]], 4) for c in codes
+                             if round(theta[bias_index[c]], 4) != 0}
+    stats = {'samples': n, 'loss_before': round(start_loss, 4), 'loss_after': round(loss, 4),
+             'top1_before': round(start_hits, 4), 'top1_after': round(hits, 4),
+             'backend': 'numpy' if use_numpy else 'python'}
+    return fitted, stats
+
+
+def train(path=weights_artifact.WEIGHTS_FILE, min_samples=MIN_SAMPLES, **fit_options):
+    # Fits on every recorded choice and writes the artifact; returns it, or
+    # None when there is too little data to replace the current weights
+    examples, skipped = training_examples(query_all(TRAINING_SQL))
+    if len(examples) < min_samples:
+        print(f'Only {len(examples)} usable choices ({skipped} skipped); need {min_samples}. Weights unchanged.')
+        return None
+    fitted, stats = fit_weights(examples, **fit_options)
+    artifact = weights_artifact.save(fitted, path, skipped=skipped, **stats)
+    print(f"Trained on {stats['samples']} choices ({skipped} skipped, {stats['backend']}): "
+          f"loss {stats['loss_before']} -> {stats['loss_after']}, "
+          f"top-1 {stats['top1_before']} -> {stats['top1_after']}")
+    print(f"Wrote {path} (version {artifact['version']})")
+    return artifact
+
+
 if __name__ == '__main__':
-    run()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description='Seed the database, sync catalogs or train scoring weights')
+    ap.add_argument('--sync', action='store_true', help='apply only catalog rows that differ from the DB')
+    ap.add_argument('--train', action='store_true', help='fit scoring weights from recorded course choices')
+    ap.add_argument('--weights', default=weights_artifact.WEIGHTS_FILE, help='artifact path written by --train')
+    ap.add_argument('--min-samples', type=int, default=MIN_SAMPLES)
+    args = ap.parse_args()
+    if args.sync:
+        init_db()
+        sync_catalogs()
+    elif args.train:
+        init_db()
+        train(args.weights, args.min_samples)
+    else:
+        run()
@@ -0,0 +1,114 @@
+"""Pre-fork launcher: several server processes sharing one port.
+
+Each worker process binds the port itself with SO_REUSEPORT, so the kernel
+balances new connections across them and every process gets its own GIL.
+Caches stay per process; writes reach the other workers through
+``change_log`` (see ``db.ChangeFeed``). On SIGINT/SIGTERM the parent signals
+every worker, which stops accepting and drains its in-flight requests; after
+``grace`` seconds stragglers are killed. Workers that die on their own are
+restarted.
+"""
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+
+from . import hashing
+from . import metrics
+from . import server
+from . import weights
+from . import writebehind
+from .db import close_pool, init_db
+
+SHUTDOWN_GRACE = 30
+RESTART_DELAY = 1.0
+
+
+def _worker(index, host, port, workers, hash_workers, hash_queue, profile_slowest, profile_dir, weights_path,
+            write_batch, write_delay, write_queue):
+    # Forked children share the parent's random state
+    random.seed()
+    if profile_slowest:
+        metrics.enable_profiler(profile_slowest, os.path.join(profile_dir, f'worker-{index}'))
+    hashing.configure(hash_workers, hash_queue)
+    writebehind.configure(write_batch, write_delay, write_queue)
+    server.warm_caches()
+    httpd = server.make_server(host, port, 'pooled', workers, reuse_port=True)
+    # One session reaper is enough for the whole group
+    server.serve(httpd, reap=index == 0, weights_path=weights_path)
+
+
+def run(host='127.0.0.1', port=8000, processes=2, workers=16, hash_workers=0, hash_queue=None,
+        profile_slowest=0, profile_dir='profiles', grace=SHUTDOWN_GRACE, weights_path=weights.WEIGHTS_FILE,
+        write_batch=0, write_delay=writebehind.MAX_DELAY, write_queue=writebehind.MAX_PENDING):
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise SystemExit('prefork mode needs SO_REUSEPORT, which this platform lacks')
+    init_db()
+    # Nothing may hold a connection or thread across fork()
+    close_pool()
+
+    # Reserve the port (resolving port 0) with a socket that never listens,
+    # so it takes no share of the connections
+    holder = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    holder.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    holder.bind((host, port))
+    port = holder.getsockname()[1]
+
+    children = {}
+    stopping = False
+    deadline = None
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                holder.close()
+                _worker(index, host, port, workers, hash_workers, hash_queue, profile_slowest, profile_dir, weights_path,
+                        write_batch, write_delay, write_queue)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping, deadline
+        if not stopping:
+            stopping = True
+            deadline = time.monotonic() + grace
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for i in range(processes):
+        spawn(i)
+    print(f'Server running at http://{host}:{port} (prefork, {processes} processes)')
+
+    try:
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if stopping and time.monotonic() > deadline:
+                    for pid in list(children):
+                        os.kill(pid, signal.SIGKILL)
+                    deadline = float('inf')
+                time.sleep(0.2)
+                continue
+            index = children.pop(pid)
+            if not stopping:
+                print(f'worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting')
+                time.sleep(RESTART_DELAY)
+                if not stopping:
+                    spawn(index)
+    finally:
+        holder.close()
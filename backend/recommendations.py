@@ -0,0 +1,189 @@
+"""Memoized course recommendations.
+
+Results are cached in memory (LRU, per user) and persisted to the
+``recommendations`` table together with the key they were computed for:
+the user's latest profile id, the id and result of their latest aptitude
+and personality sessions, and the scoring-weights version. ``/api/form`` and the test endpoints call
+``user_changed(uid)``, which evicts the user here and in every other server
+process; an in-memory hit is then safe to serve without touching the DB or
+the scoring path.
+"""
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from .db import query_one, execute, on_change, notify_change
+from .logic import pick_personality, recommend_courses, current_model, COURSE_LABELS
+
+CACHE_SIZE = 10_000
+
+LATEST_SQL = '''
+SELECT p.id AS profile_id,
+       a.id AS apt_id, a.total_marks AS apt_total, a.result_json AS apt_result,
+       s.id AS per_id, s.result_json AS per_result
+FROM (SELECT id FROM profiles WHERE user_id=:uid ORDER BY id DESC LIMIT 1) AS p
+LEFT JOIN (SELECT id, total_marks, result_json FROM test_sessions
+           WHERE user_id=:uid AND kind='aptitude' ORDER BY id DESC LIMIT 1) AS a ON 1
+LEFT JOIN (SELECT id, result_json FROM test_sessions
+           WHERE user_id=:uid AND kind='personality' ORDER BY id DESC LIMIT 1) AS s ON 1
+'''
+
+
+def _crc(text):
+    return zlib.crc32(text.encode('utf-8')) if text else 0
+
+
+def aptitude20_from(total_marks, result_json) -> int:
+    try:
+        total = int(total_marks or 20)
+    except Exception:
+        total = 20
+
+    apt_score_raw = 0
+    if result_json:
+        try:
+            parsed = json.loads(result_json)
+            if isinstance(parsed, dict):
+                apt_score_raw = parsed.get('score', 0)
+            elif isinstance(parsed, (int, float)):
+                apt_score_raw = parsed
+        except Exception:
+            apt_score_raw = 0
+
+    try:
+        apt_score_num = float(apt_score_raw)
+    except Exception:
+        apt_score_num = 0.0
+
+    try:
+        return int(round((apt_score_num / max(1, total)) * 20))
+    except Exception:
+        return 0
+
+
+def personality_from(result_json) -> str:
+    traits = {}
+    if result_json:
+        try:
+            parsed = json.loads(result_json)
+            if isinstance(parsed, dict):
+                traits = parsed
+        except Exception:
+            traits = {}
+    return pick_personality(traits)
+
+
+def compute(profile: dict, latest: dict, model=None) -> dict:
+    # Safe defaults when a test was never taken
+    aptitude20 = 0
+    personality_type = 'Analytical'
+    if latest['apt_id'] is not None:
+        aptitude20 = aptitude20_from(latest['apt_total'], latest['apt_result'])
+    if latest['per_id'] is not None:
+        personality_type = personality_from(latest['per_result'])
+
+    courses_raw = recommend_courses(
+        profile.get('stream'), # pyright: ignore[reportArgumentType]
+        profile.get('board_marks', 0),
+        aptitude20,
+        personality_type,
+        profile.get('dream_course'),
+        model
+    )
+    # Format for frontend
+    formatted = [{"code": code, "name": COURSE_LABELS.get(code, code), "fit": fit}
+                 for code, fit in courses_raw]
+    return {
+        'aptitude20': aptitude20,
+        'personality': personality_type,
+        'courses': formatted
+    }
+
+
+class RecommendationCache:
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; a result computed across a bump is
+        # returned but not cached, since it may already be stale.
+        self._version = 0
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._version += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self, ids=None):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def _put(self, user_id, payload, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[user_id] = payload
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get(self, user_id: int) -> Optional[dict]:
+        # Returns the recommendation payload, or None if the user has no profile
+        with self._lock:
+            payload = self._entries.get(user_id)
+            if payload is not None:
+                self._entries.move_to_end(user_id)
+                return payload
+            version = self._version
+
+        latest = query_one(LATEST_SQL, {'uid': user_id})
+        if latest is None:
+            return None
+        model = current_model()
+        key = [latest['profile_id'], latest['apt_id'], _crc(latest['apt_result']),
+               latest['per_id'], _crc(latest['per_result']), model.version]
+
+        stored = query_one('SELECT courses_json FROM recommendations WHERE user_id=? ORDER BY id DESC LIMIT 1', (user_id,))
+        if stored:
+            try:
+                record = json.loads(stored['courses_json'])
+            except ValueError:
+                record = None
+            if isinstance(record, dict) and record.get('key') == key:
+                payload = record['result']
+                self._put(user_id, payload, version)
+                return payload
+
+        profile = query_one('SELECT * FROM profiles WHERE id=?', (latest['profile_id'],))
+        payload = compute(profile, dict(latest), model) # pyright: ignore[reportArgumentType]
+        execute('INSERT INTO recommendations(user_id, courses_json) VALUES(?,?)',
+                (user_id, json.dumps({'key': key, 'result': payload}, ensure_ascii=False)))
+        self._put(user_id, payload, version)
+        return payload
+
+
+recommendation_cache = RecommendationCache()
+
+
+def _changed(ids=None):
+    if ids is None:
+        recommendation_cache.clear()
+        return
+    for user_id in ids:
+        recommendation_cache.invalidate(user_id)
+
+
+on_change('recommendations', _changed)
+
+
+def user_change(user_id: int):
+    # The change user_changed announces, for writers that log it themselves
+    return 'recommendations', [user_id]
+
+
+def user_changed(user_id: int):
+    # Call after writing a profile or test session for user_id
+    notify_change(*user_change(user_id))
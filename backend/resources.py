@@ -0,0 +1,63 @@
+"""Free learning resources per course, kept as ready-to-send JSON.
+
+The unpaged ``/api/resources`` answer depends only on the course code, so
+``ResourceCache`` reads the free rows once and keeps each course's whole
+response body as ``serialize.Raw`` bytes; a hit costs one dict lookup, with
+no SQL and no encoding. Any change to the resources table (a reseed, an
+ingest run, here or in another process via the change feed) drops the map
+and the next reader rebuilds it.
+"""
+import threading
+from itertools import groupby
+from operator import itemgetter
+
+from . import serialize
+from .db import on_change, query_rows
+
+LISTING_SQL = 'SELECT course_code,title,url FROM resources WHERE is_free=1 ORDER BY course_code, id'
+
+_EMPTY = serialize.listing('resources', [])
+
+
+class ResourceCache:
+    """Course code -> encoded ``{"resources": [{title, url}, ...]}``.
+
+    Versioned like ``tests_engine.QuestionCache``: a load that races with
+    an invalidation is used once but not kept.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._data = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, ids=None):
+        with self._lock:
+            self.version += 1
+            self._data = None
+
+    def get(self):
+        data = self._data
+        if data is None:
+            version = self.version
+            data = self._load()
+            with self._lock:
+                if self.version == version:
+                    self._data = data
+        return data
+
+    @staticmethod
+    def _load():
+        columns, rows = query_rows(LISTING_SQL)
+        columns = columns[1:]
+        return {code: serialize.listing('resources', serialize.encode_rows(columns, [r[1:] for r in group]))
+                for code, group in groupby(rows, key=itemgetter(0))}
+
+    def listing(self, code) -> serialize.Raw:
+        if not isinstance(code, str):
+            return _EMPTY
+        return self.get().get(code, _EMPTY)
+
+
+resource_cache = ResourceCache()
+on_change('resources', resource_cache.invalidate)
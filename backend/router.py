@@ -0,0 +1,158 @@
+"""Table-driven request routing for the JSON API.
+
+Handlers are registered with ``@router.route(method, path, ...)`` and looked
+up by exact path in a dict, so dispatch costs the same however many routes
+exist. The shared steps every endpoint used to repeat inline (bearer-token
+auth, JSON body parsing, query-string parsing) are applied by the router
+before the handler runs, as selected by the route's flags.
+"""
+import gzip
+import json
+import urllib.parse as urlparse
+from typing import Callable, Dict, Optional
+
+from . import metrics
+from . import serialize
+from . import sessions
+from .serialize import Raw
+from .static import accepted_encodings
+
+
+# Opt-in: API responses at least this many bytes long are gzipped for
+# clients that accept it (None = never)
+GZIP_MIN_SIZE = None
+GZIP_LEVEL = 6
+
+
+def configure_gzip(min_size=None, level=GZIP_LEVEL):
+    global GZIP_MIN_SIZE, GZIP_LEVEL
+    GZIP_MIN_SIZE = min_size
+    GZIP_LEVEL = level
+
+
+def json_response(handler, status=200, data=None, headers=None):
+    # data may be serialize.Raw (already-encoded JSON)
+    if isinstance(data, Raw):
+        payload = data
+    else:
+        with metrics.timed(metrics.json_seconds, 'encode'):
+            payload = serialize.dumps(data or {})
+    handler.send_response(status)
+    handler.send_header('Content-Type', 'application/json; charset=utf-8')
+    if GZIP_MIN_SIZE is not None and len(payload) >= GZIP_MIN_SIZE:
+        handler.send_header('Vary', 'Accept-Encoding')
+        if 'gzip' in accepted_encodings(handler.headers.get('Accept-Encoding')):
+            payload = gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+            handler.send_header('Content-Encoding', 'gzip')
+    handler.send_header('Content-Length', str(len(payload)))
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.end_headers()
+    handler.wfile.write(payload)
+
+
+def parse_body(handler):
+    handler.body_read = True
+    length = int(handler.headers.get('Content-Length', '0'))
+    if length == 0:
+        return {}
+    raw = handler.rfile.read(length)
+    try:
+        with metrics.timed(metrics.json_seconds, 'decode'):
+            return json.loads(raw)
+    except Exception:
+        return {}
+
+
+def parse_query(qs: str) -> Dict[str, str]:
+    # First value wins for repeated keys, like the old parse_qs(...)[0] lookups
+    query = {}
+    for key, value in urlparse.parse_qsl(qs, keep_blank_values=True):
+        query.setdefault(key, value)
+    return query
+
+
+def bearer_token(handler):
+    return handler.headers.get('Authorization', '').replace('Bearer ', '')
+
+
+class Request:
+    """What a route handler gets besides the raw handler object."""
+    __slots__ = ('method', 'path', 'query', 'uid', 'data')
+
+    def __init__(self, method, path, query):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.uid = None
+        self.data = {}
+
+
+class Route:
+    __slots__ = ('method', 'path', 'fn', 'auth', 'body')
+
+    def __init__(self, method, path, fn, auth, body):
+        self.method = method
+        self.path = path
+        self.fn = fn
+        self.auth = auth
+        self.body = body
+
+    def __call__(self, handler, req):
+        if self.auth:
+            req.uid = sessions.lookup(bearer_token(handler))
+            if not req.uid:
+                return json_response(handler, 401, {'error': 'unauthorized'})
+        if self.body:
+            req.data = parse_body(handler)
+        return self.fn(handler, req)
+
+
+class Router:
+    """Exact-match route table: ``{path: {method: Route}}``."""
+
+    def __init__(self, prefix='/api/'):
+        self.prefix = prefix
+        self._table: Dict[str, Dict[str, Route]] = {}
+
+    def route(self, method: str, path: str, auth=False, body=False) -> Callable:
+        def register(fn):
+            methods = self._table.setdefault(path, {})
+            if method in methods:
+                raise ValueError(f'duplicate route: {method} {path}')
+            methods[method] = Route(method, path, fn, auth, body)
+            return fn
+        return register
+
+    def paths(self):
+        return frozenset(self._table)
+
+    def __contains__(self, path):
+        return path in self._table
+
+    def owns(self, path: str) -> bool:
+        # Paths under the prefix are answered by the router, even if unmatched
+        return path.startswith(self.prefix)
+
+    def match(self, method: str, path: str) -> Optional[Route]:
+        methods = self._table.get(path)
+        return methods.get(method) if methods else None
+
+    def dispatch(self, handler, method: str) -> bool:
+        # Returns False when the path is outside the router's prefix, leaving
+        # it to the caller (static files); everything else gets a response.
+        path, _, qs = handler.path.partition('?')
+        if not path.startswith(self.prefix):
+            return False
+        methods = self._table.get(path)
+        if not methods:
+            json_response(handler, 404, {'error': 'not found'})
+            return True
+        route = methods.get(method)
+        if route is None:
+            allow = ','.join(sorted(set(methods) | {'OPTIONS'}))
+            json_response(handler, 405, {'error': 'method not allowed'}, {'Allow': allow})
+            return True
+        route(handler, Request(method, path, parse_query(qs) if qs else {}))
+        return True
@@ -20,6 +20,8 @@ CREATE TABLE IF NOT EXISTS sessions (
   FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at);
+
 -- Intake Form Submissions
 CREATE TABLE IF NOT EXISTS profiles (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -43,7 +45,8 @@ CREATE TABLE IF NOT EXISTS test_questions (
   question TEXT NOT NULL,
   options_json TEXT NOT NULL,
   answer_key TEXT,
-  trait_map_json TEXT
+  trait_map_json TEXT,
+  difficulty INTEGER -- optional, 1 (easy) .. 3 (hard)
 );
 
 CREATE TABLE IF NOT EXISTS test_sessions (
@@ -53,6 +56,7 @@ CREATE TABLE IF NOT EXISTS test_sessions (
   total_marks INTEGER NOT NULL,
   score INTEGER DEFAULT 0,
   result_json TEXT,
+  question_ids TEXT, -- comma separated ids issued for this session
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
   FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
 );
@@ -71,6 +75,20 @@ CREATE TABLE IF NOT EXISTS colleges (
   website TEXT
 );
 
+-- Normalized course <-> college mapping, derived from colleges.courses
+CREATE TABLE IF NOT EXISTS college_courses (
+  course_code TEXT NOT NULL,
+  college_id INTEGER NOT NULL,
+  PRIMARY KEY(course_code, college_id),
+  FOREIGN KEY(college_id) REFERENCES colleges(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_college_courses_college ON college_courses(college_id);
+CREATE INDEX IF NOT EXISTS idx_colleges_country ON colleges(country COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_colleges_city ON colleges(city COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_colleges_gov ON colleges(is_government, fees_per_year);
+CREATE INDEX IF NOT EXISTS idx_colleges_fees ON colleges(fees_per_year);
+
 CREATE TABLE IF NOT EXISTS resources (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   course_code TEXT NOT NULL,
@@ -79,6 +97,17 @@ CREATE TABLE IF NOT EXISTS resources (
   is_free INTEGER NOT NULL DEFAULT 1
 );
 
+-- Natural keys used by bulk upserts (backend/ingest.py) are unique
+-- indexes created by db.init_db (UNIQUE_INDEXES), which first drops
+-- duplicate rows that older databases may hold
+
+-- Checkpoints for resumable bulk loads
+CREATE TABLE IF NOT EXISTS ingest_progress (
+  source TEXT PRIMARY KEY,
+  rows_done INTEGER NOT NULL,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Recommendations stored for traceability
 CREATE TABLE IF NOT EXISTS recommendations (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -87,3 +116,33 @@ CREATE TABLE IF NOT EXISTS recommendations (
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
   FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
 );
+
+CREATE INDEX IF NOT EXISTS idx_recommendations_user ON recommendations(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_profiles_user ON profiles(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_test_sessions_user ON test_sessions(user_id, kind, id);
+-- Free resources of one course in id order (keyset pages on /api/resources)
+CREATE INDEX IF NOT EXISTS idx_resources_course ON resources(course_code, is_free, id);
+
+-- Change feed: notify_change() records writes here so other processes
+-- (prefork workers, ingest runs) can drop their caches (db.ChangeFeed)
+CREATE TABLE IF NOT EXISTS change_log (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  tbl TEXT NOT NULL,
+  ids TEXT,
+  pid INTEGER NOT NULL,
+  at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_change_log_at ON change_log(at);
+
+-- Courses users went on to explore, with the profile and test sessions in
+-- effect at the time: training labels for ml_train --train
+CREATE TABLE IF NOT EXISTS course_choices (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL,
+  course_code TEXT NOT NULL,
+  profile_id INTEGER NOT NULL,
+  apt_session_id INTEGER,
+  per_session_id INTEGER,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
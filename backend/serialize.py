@@ -0,0 +1,94 @@
+"""JSON encoding for API responses.
+
+``dumps`` turns a Python object into compact UTF-8 JSON bytes using the
+active encoder: orjson when it is installed (``pip install orjson``), else
+the stdlib encoder. ``encode_rows`` serializes listing rows straight from
+sqlite3 cursor tuples with precomputed ``"key":`` prefixes, so no per-row
+dict is built on the stdlib path. ``Raw`` marks bytes that are already JSON
+and are spliced into a response as they are.
+"""
+import json
+from json.encoder import encode_basestring
+from typing import List, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json only
+    orjson = None
+
+
+class Raw(bytes):
+    """Already-encoded JSON."""
+
+
+_generic = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+# Per-column fast paths keyed by the first row's type; a column whose values
+# turn out to be mixed (e.g. NULLs) raises TypeError and falls back.
+_FAST = {str: encode_basestring, int: int.__repr__}
+
+
+class StdlibEncoder:
+    name = 'stdlib'
+
+    def dumps(self, obj) -> bytes:
+        return _generic(obj).encode('utf-8')
+
+    def rows(self, columns: Sequence[str], rows: List[tuple]) -> bytes:
+        if not rows:
+            return b'[]'
+        template = '{' + ','.join(f'{encode_basestring(c)}:%s' for c in columns) + '}'
+        encoded = []
+        for first, col in zip(rows[0], zip(*rows)):
+            fast = _FAST.get(type(first))
+            try:
+                encoded.append(list(map(fast or _generic, col)))
+            except TypeError:
+                encoded.append(list(map(_generic, col)))
+        return ('[' + ','.join([template % values for values in zip(*encoded)]) + ']').encode('utf-8')
+
+
+class OrjsonEncoder:
+    name = 'orjson'
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def rows(self, columns: Sequence[str], rows: List[tuple]) -> bytes:
+        # orjson's dict path outruns any per-value work done in Python
+        return orjson.dumps([dict(zip(columns, r)) for r in rows])
+
+
+ENCODERS = {'stdlib': StdlibEncoder}
+if orjson is not None:
+    ENCODERS['orjson'] = OrjsonEncoder
+
+encoder = OrjsonEncoder() if orjson is not None else StdlibEncoder()
+
+
+def use(name='auto'):
+    # Select the encoder by name; 'auto' prefers orjson when installed
+    global encoder
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in ENCODERS:
+        raise ValueError(f'JSON encoder not available: {name}')
+    encoder = ENCODERS[name]()
+    return encoder
+
+
+def dumps(obj) -> bytes:
+    return obj if isinstance(obj, Raw) else encoder.dumps(obj)
+
+
+def encode_rows(columns: Sequence[str], rows: List[tuple]) -> Raw:
+    return Raw(encoder.rows(columns, rows))
+
+
+def listing(key: str, items, **extra) -> Raw:
+    # {"<key>": items, **extra}, where items may itself be Raw
+    parts = [b'{', dumps(key), b':', dumps(items)]
+    for k, v in extra.items():
+        parts += [b',', dumps(k), b':', dumps(v)]
+    parts.append(b'}')
+    return Raw(b''.join(parts))
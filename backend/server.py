@@ -1,307 +1,728 @@
 
 from http.server import SimpleHTTPRequestHandler, HTTPServer
+import argparse
 import json
 import os
-import urllib.parse as urlparse
-from datetime import datetime, timedelta
-import hashlib, hmac, secrets
-
-from .db import init_db, execute, query_one, query_all, connect
-from .tests_engine import score_aptitude, score_personality
-from .logic import pick_personality, recommend_courses, filter_colleges, COURSE_LABELS
+import queue
+import signal
+import socket
+import threading
+import time
+import secrets
+
+from .db import init_db, execute, query_one, iter_query, connect, close_pool, ChangeFeed
+from .tests_engine import score_aptitude, score_personality, question_cache, assemble_test, questions_for, STRATEGIES, QUESTIONS_PER_TEST
+from .logic import recommend_courses_batch, COURSE_LABELS
+from .recommendations import recommendation_cache, user_change, LATEST_SQL
+from . import weights
+from . import sessions
+from . import hashing
+from . import writebehind
+from .errors import Overloaded
+from .static import AssetStore
+from . import metrics
+from . import serialize
+from .colleges import college_index
+from .resources import resource_cache
+from .router import Router, json_response, bearer_token, configure_gzip
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(BASE_DIR)
 FRONTEND_DIR = os.path.join(ROOT_DIR, 'frontend')
 
+static_assets = AssetStore(FRONTEND_DIR)
+
 # ---------- Utilities ----------
 
-def json_response(handler, status=200, data=None):
-    payload = json.dumps(data or {}, ensure_ascii=False).encode('utf-8')
+STREAM_CHUNK_SIZE = 16 * 1024
+MAX_PAGE_SIZE = 500
+MAX_BATCH_PROFILES = 10_000
+
+
+def stream_json_response(handler, key, rows, tail=None, status=200):
+    # Sends {"<key>": [...rows], **tail()} encoding one row at a time, so the
+    # full list is never built. HTTP/1.1 clients get chunked transfer-encoding;
+    # HTTP/1.0 gets a body delimited by closing the connection.
+    chunked = handler.request_version == 'HTTP/1.1' and handler.protocol_version == 'HTTP/1.1'
     handler.send_response(status)
     handler.send_header('Content-Type', 'application/json; charset=utf-8')
-    handler.send_header('Content-Length', str(len(payload)))
     handler.send_header('Access-Control-Allow-Origin', '*')
+    if chunked:
+        handler.send_header('Transfer-Encoding', 'chunked')
+    else:
+        handler.send_header('Connection', 'close')
+        handler.close_connection = True
     handler.end_headers()
-    handler.wfile.write(payload)
-
 
-def parse_body(handler):
-    length = int(handler.headers.get('Content-Length', '0'))
-    if length == 0:
-        return {}
-    raw = handler.rfile.read(length)
+    def send(data):
+        if chunked:
+            handler.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        else:
+            handler.wfile.write(data)
+
+    dumps = serialize.dumps
+    out = [b'{' + dumps(key) + b':[']
+    size = 0
+    sep = b''
+    for row in rows:
+        part = sep + dumps(row)
+        sep = b','
+        out.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            send(b''.join(out))
+            out, size = [], 0
+    out.append(b']')
+    for k, v in (tail() if tail else {}).items():
+        out.append(b',' + dumps(k) + b':' + dumps(v))
+    out.append(b'}')
+    send(b''.join(out))
+    if chunked:
+        handler.wfile.write(b'0\r\n\r\n')
+
+
+def page_params(handler, data):
+    # Returns (limit, after, stream) from a listing request body; limit is None
+    # when the client did not ask for pagination. Sends a 400 and returns None
+    # on bad input.
+    limit = data.get('limit')
+    if limit is not None:
+        try:
+            limit = max(1, min(MAX_PAGE_SIZE, int(limit)))
+        except (TypeError, ValueError):
+            json_response(handler, 400, {'error': 'invalid limit'})
+            return None
+    return limit, data.get('after'), bool(data.get('stream'))
+
+
+class Page:
+    # Wraps (cursor, row) pairs and yields at most ``limit`` rows; once
+    # exhausted, ``next`` holds the cursor to resume from, or None at the end.
+    def __init__(self, items, limit):
+        self.items = items
+        self.limit = limit
+        self.next = None
+
+    def __iter__(self):
+        count = 0
+        last = None
+        for cursor, row in self.items:
+            if self.limit is not None and count == self.limit:
+                self.next = last
+                return
+            last = cursor
+            count += 1
+            yield row
+
+    def send(self, handler, key, stream):
+        if stream:
+            tail = (lambda: {'next': self.next}) if self.limit is not None else None
+            return stream_json_response(handler, key, self, tail)
+        rows = list(self)
+        data = {key: rows}
+        if self.limit is not None:
+            data['next'] = self.next
+        return json_response(handler, 200, data)
+
+
+api = Router()
+
+
+def route_label(path):
+    # Bounded label set for metrics: registered API routes, else a catch-all
+    path = path.split('?', 1)[0]
+    if api.owns(path):
+        return path if path in api else '/api/unmatched'
+    return 'static'
+
+
+@metrics.collector
+def _hash_pool_metrics():
+    lines = []
+    stats = hashing.hash_pool.stats()
+    for name, key, help in (('careerpath_hash_total', 'count', 'Password hashes computed'),
+                            ('careerpath_hash_rejected_total', 'rejected', 'Password hashes rejected as overloaded'),
+                            ('careerpath_hash_wait_seconds_total', 'wait_seconds', 'Time hashes spent queued'),
+                            ('careerpath_hash_compute_seconds_total', 'compute_seconds', 'Time spent computing hashes')):
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} counter']
+        lines += [f'{name}{{route="{route}"}} {s[key]}' for route, s in sorted(stats.items())]
+    return lines
+
+
+@metrics.collector
+def _write_queue_metrics():
+    s = writebehind.writer.stats()
+    lines = []
+    for name, key, kind, help in (('careerpath_writes_total', 'writes', 'counter', 'Writes committed or failed'),
+                                  ('careerpath_writes_failed_total', 'failed', 'counter', 'Writes that raised'),
+                                  ('careerpath_writes_rejected_total', 'rejected', 'counter', 'Writes refused by a full queue'),
+                                  ('careerpath_write_batches_total', 'batches', 'counter', 'Write transactions committed'),
+                                  ('careerpath_write_batch_largest', 'largest_batch', 'gauge', 'Most writes in one transaction'),
+                                  ('careerpath_write_commit_seconds_total', 'commit_seconds', 'counter', 'Time spent in write transactions'),
+                                  ('careerpath_write_wait_seconds_total', 'wait_seconds', 'counter', 'Time writes spent queued')):
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {s[key]}']
+    return lines
+
+
+def overloaded_response(handler, err):
+    return json_response(handler, 503, {'error': 'server busy, retry shortly'},
+                         {'Retry-After': str(err.retry_after)})
+
+
+# ---------- API routes ----------
+
+@api.route('POST', '/api/signup', body=True)
+def signup(handler, req):
+    email = (req.data.get('email') or '').strip().lower()
+    password = req.data.get('password') or ''
+    if not email or not password:
+        return json_response(handler, 400, {'error':'email and password required'})
+    salt = secrets.token_bytes(16)
     try:
-        return json.loads(raw)
+        pwd = hashing.hash_pool.hash(password, salt, req.path)
+    except Overloaded as err:
+        return overloaded_response(handler, err)
+    try:
+        execute('INSERT INTO users(email,password_hash,salt) VALUES(?,?,?)', (email, pwd, salt.hex()))
     except Exception:
-        return {}
+        return json_response(handler, 400, {'error':'email already exists'})
+    return json_response(handler, 200, {'ok': True})
 
 
-def pbkdf2_hash(password: str, salt: bytes) -> str:
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100_000)
-    return dk.hex()
+@api.route('POST', '/api/login', body=True)
+def login(handler, req):
+    email = (req.data.get('email') or '').strip().lower()
+    password = req.data.get('password') or ''
+    row = query_one('SELECT id,password_hash,salt FROM users WHERE email=?', (email,))
+    if not row:
+        return json_response(handler, 401, {'error':'invalid credentials'})
+    try:
+        ok = hashing.hash_pool.verify(password, bytes.fromhex(row['salt']), row['password_hash'], req.path)
+    except Overloaded as err:
+        return overloaded_response(handler, err)
+    if ok:
+        token = sessions.create(row['id'])
+        return json_response(handler, 200, {'token': token})
+    return json_response(handler, 401, {'error':'invalid credentials'})
 
 
-def make_token() -> str:
-    return secrets.token_hex(32)
+@api.route('POST', '/api/logout', auth=True)
+def logout(handler, req):
+    sessions.revoke(bearer_token(handler))
+    return json_response(handler, 200, {'ok': True})
 
 
-def require_auth(handler):
-    token = handler.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return None
-    row = query_one('SELECT user_id FROM sessions WHERE token=? AND expires_at>datetime("now")', (token,))
-    return row['user_id'] if row else None
+@api.route('POST', '/api/form', auth=True, body=True)
+def save_form(handler, req):
+    data = req.data
+    try:
+        writebehind.writer.write('INSERT INTO profiles(user_id, highest_qualification, stream, board_marks, city, country, abroad, budget, dream_course) VALUES(?,?,?,?,?,?,?,?,?)', (
+            req.uid,
+            data.get('highest_qualification',''),
+            data.get('stream',''),
+            float(data.get('board_marks') or 0),
+            data.get('city',''),
+            data.get('country',''),
+            1 if data.get('abroad') else 0,
+            int(data.get('budget') or 0),
+            data.get('dream_course') or None
+        ), [user_change(req.uid)])
+    except Overloaded as err:
+        return overloaded_response(handler, err)
+    return json_response(handler, 200, {'ok': True})
+
+
+@api.route('POST', '/api/test/start', auth=True, body=True)
+def start_test(handler, req):
+    kind = req.data.get('kind')
+    if kind not in ('aptitude','personality'):
+        return json_response(handler, 400, {'error':'invalid kind'})
+    strategy = req.data.get('strategy') or 'balanced'
+    if strategy not in STRATEGIES:
+        return json_response(handler, 400, {'error':'invalid strategy'})
+    seed = req.data.get('seed')
+    if seed is not None and not isinstance(seed, int):
+        return json_response(handler, 400, {'error':'invalid seed'})
+    # Pick 20 questions of that kind from the in-memory bank
+    ids = assemble_test(kind, QUESTIONS_PER_TEST, strategy, seed)
+    # Create session row; only the issued ids are stored
+    # A new (unscored) session is now the latest one recommendations read
+    try:
+        sid = writebehind.writer.write('INSERT INTO test_sessions(user_id,kind,total_marks,question_ids) VALUES(?,?,?,?)',
+                                       (req.uid, kind, len(ids), ','.join(map(str, ids))), [user_change(req.uid)])
+    except Overloaded as err:
+        return overloaded_response(handler, err)
+    return json_response(handler, 200, {'session_id': sid, 'questions': questions_for(ids)})
+
+
+@api.route('POST', '/api/test/submit', auth=True, body=True)
+def submit_test(handler, req):
+    uid = req.uid
+    sid = int(req.data.get('session_id')) # pyright: ignore[reportArgumentType]
+    answers = req.data.get('answers') or {}
+    row = query_one('SELECT kind,total_marks,question_ids FROM test_sessions WHERE id=? AND user_id=?', (sid, uid))
+    if not row:
+        return json_response(handler, 400, {'error':'invalid session'})
+    kind = row['kind']
+    # Sessions started before question_ids existed score against the whole bank
+    issued = [int(i) for i in row['question_ids'].split(',') if i] if row['question_ids'] is not None else None
+    if kind == 'aptitude':
+        score = score_aptitude({int(k): v for k,v in answers.items()}, issued)
+        result, saved = {'score': score, 'out_of': row['total_marks']}, {"score":score}
+    else:
+        traits = score_personality({int(k): v for k,v in answers.items()}, issued)
+        score, result, saved = 0, {'traits': traits}, traits
+    try:
+        writebehind.writer.write('UPDATE test_sessions SET score=?, result_json=? WHERE id=?',
+                                 (score, json.dumps(saved), sid), [user_change(uid)])
+    except Overloaded as err:
+        return overloaded_response(handler, err)
+    return json_response(handler, 200, result)
+
+
+@api.route('POST', '/api/recommendations', auth=True)
+def recommendations(handler, req):
+    result = recommendation_cache.get(req.uid)
+    if result is None:
+        return json_response(handler, 400, {'error': 'please submit form first'})
+    return json_response(handler, 200, result)
+
+
+@api.route('POST', '/api/choice', auth=True, body=True)
+def record_choice(handler, req):
+    # The course a user went on to explore, kept as a training label
+    code = req.data.get('course_code')
+    if not isinstance(code, str) or not code:
+        return json_response(handler, 400, {'error': 'course_code required'})
+    latest = query_one(LATEST_SQL, {'uid': req.uid})
+    if latest is None:
+        return json_response(handler, 400, {'error': 'please submit form first'})
+    try:
+        writebehind.writer.write('INSERT INTO course_choices(user_id, course_code, profile_id, apt_session_id, per_session_id) VALUES(?,?,?,?,?)',
+                                 (req.uid, code, latest['profile_id'], latest['apt_id'], latest['per_id']))
+    except Overloaded as err:
+        return overloaded_response(handler, err)
+    return json_response(handler, 200, {'ok': True})
+
+
+@api.route('POST', '/api/recommendations/batch', auth=True, body=True)
+def recommendations_batch(handler, req):
+    items = req.data.get('profiles')
+    if not isinstance(items, list) or len(items) > MAX_BATCH_PROFILES:
+        return json_response(handler, 400, {'error': f'profiles must be a list of at most {MAX_BATCH_PROFILES}'})
+    profiles = []
+    for i, p in enumerate(items):
+        if not isinstance(p, dict):
+            return json_response(handler, 400, {'error': f'invalid profile at index {i}'})
+        try:
+            aptitude = int(p.get('aptitude20') or 0)
+        except (TypeError, ValueError, OverflowError):
+            aptitude = None
+        if aptitude is None or not 0 <= aptitude <= 20:
+            return json_response(handler, 400, {'error': f'aptitude20 must be 0-20 at index {i}'})
+        try:
+            profile = (
+                p.get('stream'),
+                p.get('board_marks', 0),
+                aptitude,
+                p.get('personality') or 'Analytical',
+                p.get('dream_course')
+            )
+            # Codes are dict keys downstream; marks must survive float()
+            if not all(v is None or isinstance(v, str) for v in (profile[0], profile[3], profile[4])):
+                raise TypeError(p)
+            if isinstance(profile[1], bool) or not isinstance(profile[1], (int, float, str)):
+                raise TypeError(p)
+            float(profile[1])
+            profiles.append(profile)
+        except (TypeError, ValueError, OverflowError):
+            return json_response(handler, 400, {'error': f'invalid profile at index {i}'})
+    results = []
+    for courses_raw in recommend_courses_batch(profiles):
+        results.append({'courses': [
+            {"code": code, "name": COURSE_LABELS.get(code, code), "fit": fit}
+            for code, fit in courses_raw
+        ]})
+    return json_response(handler, 200, {'results': results})
+
+
+@api.route('POST', '/api/resources', auth=True, body=True)
+def resources(handler, req):
+    data = req.data
+    code = data.get('course_code')
+    paging = page_params(handler, data)
+    if paging is None:
+        return
+    limit, after, stream = paging
+    if limit is None and not stream:
+        return json_response(handler, 200, resource_cache.listing(code))
+    # Keyset pagination on id; cursor is the last id sent
+    try:
+        after_id = int(after or 0)
+    except (TypeError, ValueError):
+        return json_response(handler, 400, {'error': 'invalid cursor'})
+    sql = 'SELECT id,title,url FROM resources WHERE course_code=? AND is_free=1 AND id>? ORDER BY id'
+    params = (code, after_id)
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params += (limit + 1,)
+    items = ((str(r.pop('id')), r) for r in iter_query(sql, params))
+    return Page(items, limit).send(handler, 'resources', stream)
+
+
+@api.route('POST', '/api/colleges', auth=True, body=True)
+def colleges(handler, req):
+    data = req.data
+    code = data.get('course_code')
+    city = data.get('city','')
+    country = data.get('country','')
+    abroad = bool(data.get('abroad'))
+    budget = int(data.get('budget') or 0)
+    include_private = bool(data.get('include_private', True))
+    include_government = bool(data.get('include_government', True))
+    paging = page_params(handler, data)
+    if paging is None:
+        return
+    limit, after, stream = paging
+    if limit is None and not stream:
+        with metrics.timed(metrics.json_seconds, 'encode'):
+            payload = serialize.listing('colleges', college_index.search_json(code, city, country, abroad, budget, include_private, include_government)) # pyright: ignore[reportArgumentType]
+        return json_response(handler, 200, payload)
+    # Cursor is "<group>.<fees>.<id>" of the last row sent
+    try:
+        after_key = tuple(int(p) for p in after.split('.')) if after else None
+        if after_key is not None and len(after_key) != 3:
+            raise ValueError(after)
+    except (AttributeError, ValueError):
+        return json_response(handler, 400, {'error': 'invalid cursor'})
+    hits = college_index.iter_search(code, city, country, abroad, budget, include_private, include_government, after_key) # pyright: ignore[reportArgumentType]
+    items = (('.'.join(map(str, key)), row) for key, row in hits)
+    return Page(items, limit).send(handler, 'colleges', stream)
+
+
+@api.route('GET', '/api/college')
+def college(handler, req):
+    try:
+        cid = int(req.query.get('id', '0'))
+    except ValueError:
+        return json_response(handler, 400, {'error': 'invalid id'})
+    row = college_index.get(cid)
+    if not row:
+        return json_response(handler, 404, {'error':'not found'})
+    return json_response(handler, 200, {'college': row})
+
+
+@api.route('GET', '/api/_metrics')
+def metrics_page(handler, req):
+    payload = metrics.render()
+    handler.send_response(200)
+    handler.send_header('Content-Type', metrics.CONTENT_TYPE)
+    handler.send_header('Content-Length', str(len(payload)))
+    handler.end_headers()
+    handler.wfile.write(payload)
+
 
 # ---------- HTTP Handler ----------
 
 class Handler(SimpleHTTPRequestHandler):
-    def translate_path(self, path):
-        # Serve frontend files as default
-        webroot = FRONTEND_DIR
-        if path.startswith('/api/'):
-            return super().translate_path(path)
-        # Map '/' to index.html
-        path = path.split('?',1)[0]
-        if path == '/' or path == '':
-            return os.path.join(webroot, 'index.html')
-        return os.path.join(webroot, path.lstrip('/'))
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+
+    def handle_one_request(self):
+        # Times each request and records it by route; optionally profiles it
+        self.response_status = None
+        profiler = metrics.profiler
+        prof = profiler.start() if profiler else None
+        t0 = time.perf_counter()
+        try:
+            super().handle_one_request()
+        finally:
+            elapsed = time.perf_counter() - t0
+            if self.response_status is not None:
+                route = route_label(getattr(self, 'path', ''))
+                method = getattr(self, 'command', None) or ''
+                metrics.request_seconds.observe(elapsed, method, route)
+                metrics.responses.inc(method, route, self.response_status)
+                if prof:
+                    profiler.finish(prof, elapsed, route)
+            elif prof:
+                prof.disable()
+            metrics.set_route(None)
+
+    def parse_request(self):
+        ok = super().parse_request()
+        if ok:
+            metrics.set_route(route_label(self.path))
+        return ok
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
     def do_POST(self):
-        if self.path == '/api/signup':
-            data = parse_body(self)
-            email = (data.get('email') or '').strip().lower()
-            password = data.get('password') or ''
-            if not email or not password:
-                return json_response(self, 400, {'error':'email and password required'})
-            salt = secrets.token_bytes(16)
-            pwd = pbkdf2_hash(password, salt)
-            try:
-                uid = execute('INSERT INTO users(email,password_hash,salt) VALUES(?,?,?)', (email, pwd, salt.hex()))
-            except Exception:
-                return json_response(self, 400, {'error':'email already exists'})
-            return json_response(self, 200, {'ok': True})
-
-        if self.path == '/api/login':
-            data = parse_body(self)
-            email = (data.get('email') or '').strip().lower()
-            password = data.get('password') or ''
-            row = query_one('SELECT id,password_hash,salt FROM users WHERE email=?', (email,))
-            if not row:
-                return json_response(self, 401, {'error':'invalid credentials'})
-            pwd = pbkdf2_hash(password, bytes.fromhex(row['salt']))
-            if hmac.compare_digest(pwd, row['password_hash']):
-                token = make_token()
-                expires = (datetime.utcnow() + timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
-                execute('INSERT INTO sessions(user_id, token, expires_at) VALUES(?,?,?)', (row['id'], token, expires))
-                return json_response(self, 200, {'token': token})
-            return json_response(self, 401, {'error':'invalid credentials'})
-
-        if self.path == '/api/form':
-            uid = require_auth(self)
-            if not uid:
-                return json_response(self, 401, {'error':'unauthorized'})
-            data = parse_body(self)
-            execute('INSERT INTO profiles(user_id, highest_qualification, stream, board_marks, city, country, abroad, budget, dream_course) VALUES(?,?,?,?,?,?,?,?,?)', (
-                uid,
-                data.get('highest_qualification',''),
-                data.get('stream',''),
-                float(data.get('board_marks') or 0),
-                data.get('city',''),
-                data.get('country',''),
-                1 if data.get('abroad') else 0,
-                int(data.get('budget') or 0),
-                data.get('dream_course') or None
-            ))
-            return json_response(self, 200, {'ok': True})
-
-        if self.path == '/api/test/start':
-            uid = require_auth(self)
-            if not uid:
-                return json_response(self, 401, {'error':'unauthorized'})
-            data = parse_body(self)
-            kind = data.get('kind')
-            if kind not in ('aptitude','personality'):
-                return json_response(self, 400, {'error':'invalid kind'})
-            # Select 20 questions of that kind
-            rows = query_all('SELECT id,question,options_json FROM test_questions WHERE kind=? ORDER BY id LIMIT 20', (kind,))
-            # Create session row
-            sid = execute('INSERT INTO test_sessions(user_id,kind,total_marks) VALUES(?,?,?)', (uid, kind, len(rows)))
-            for r in rows:
-                r['options'] = json.loads(r.pop('options_json'))
-            return json_response(self, 200, {'session_id': sid, 'questions': rows})
-
-        if self.path == '/api/test/submit':
-            uid = require_auth(self)
-            if not uid:
-                return json_response(self, 401, {'error':'unauthorized'})
-            data = parse_body(self)
-            sid = int(data.get('session_id')) # pyright: ignore[reportArgumentType]
-            answers = data.get('answers') or {}
-            row = query_one('SELECT kind,total_marks FROM test_sessions WHERE id=? AND user_id=?', (sid, uid))
-            if not row:
-                return json_response(self, 400, {'error':'invalid session'})
-            kind = row['kind']
-            if kind == 'aptitude':
-                score = score_aptitude({int(k): v for k,v in answers.items()})
-                execute('UPDATE test_sessions SET score=?, result_json=? WHERE id=?', (score, json.dumps({"score":score}), sid))
-                return json_response(self, 200, {'score': score, 'out_of': row['total_marks']})
-            else:
-                traits = score_personality({int(k): v for k,v in answers.items()})
-                execute('UPDATE test_sessions SET score=?, result_json=? WHERE id=?', (0, json.dumps(traits), sid))
-                return json_response(self, 200, {'traits': traits})
-        
-        if self.path == '/api/recommendations':
-            uid = require_auth(self)
-            if not uid:
-                return json_response(self, 401, {'error': 'unauthorized'})
-
-        # Get latest profile
-            profile = query_one(
-                'SELECT * FROM profiles WHERE user_id=? ORDER BY id DESC LIMIT 1',
-                (uid,)
-            )
-            if not profile:
-                return json_response(self, 400, {'error': 'please submit form first'})
-
-        # ------------------ Get latest tests ------------------
-            apt = query_one(
-                'SELECT * FROM test_sessions WHERE user_id=? AND kind="aptitude" ORDER BY id DESC LIMIT 1',
-                (uid,)
-            )
-            per = query_one(
-                'SELECT * FROM test_sessions WHERE user_id=? AND kind="personality" ORDER BY id DESC LIMIT 1',
-                (uid,)
-        )
-
-        # Safe defaults
-            aptitude20 = 0
-            personality_type = 'Analytical'
-
-            # ---- Parse aptitude result safely ----
-            if apt:
-                try:
-                    total = int(apt.get('total_marks') or 20)
-                except Exception:
-                    total = 20
-
-                apt_score_raw = 0
-                apt_result_json = apt.get('result_json')
-
-                if apt_result_json:
-                    try:
-                        parsed = json.loads(apt_result_json)
-                        if isinstance(parsed, dict):
-                            apt_score_raw = parsed.get('score', 0)
-                        elif isinstance(parsed, (int, float)):
-                            apt_score_raw = parsed
-                    except Exception:
-                        apt_score_raw = 0
-
-                try:
-                    apt_score_num = float(apt_score_raw)
-                except Exception:
-                    apt_score_num = 0.0
-
-                try:
-                    aptitude20 = int(round((apt_score_num / max(1, total)) * 20))
-                except Exception:
-                    aptitude20 = 0
-
-                    # ---- Parse personality result safely ----
-            if per:
-                traits = {}
-                per_result_json = per.get('result_json')
-                if per_result_json:
-                    try:
-                        parsed_per = json.loads(per_result_json)
-                        if isinstance(parsed_per, dict):
-                            traits = parsed_per
-                    except Exception:
-                        traits = {}
-                personality_type = pick_personality(traits)
-
-         # ------------------ Build recommendations ------------------
-            courses_raw = recommend_courses(
-                profile.get('stream'), # pyright: ignore[reportArgumentType]
-                profile.get('board_marks', 0),
-                aptitude20,
-                personality_type,
-                profile.get('dream_course')
-            )
-
-            # Format for frontend
-            formatted = []
-            for code, fit in courses_raw:
-                formatted.append({
-                    "code": code,
-                    "name": COURSE_LABELS.get(code, code),
-                    "fit": fit
-                })
-
-            return json_response(self, 200, {
-                'aptitude20': aptitude20,
-                'personality': personality_type,
-                'courses': formatted
-            })
-
-            
-
-
-        if self.path == '/api/resources':
-            uid = require_auth(self)
-            if not uid:
-                return json_response(self, 401, {'error':'unauthorized'})
-            data = parse_body(self)
-            code = data.get('course_code')
-            rows = query_all('SELECT title,url FROM resources WHERE course_code=? AND is_free=1', (code,))
-            return json_response(self, 200, {'resources': rows})
-
-        if self.path == '/api/colleges':
-            uid = require_auth(self)
-            if not uid:
-                return json_response(self, 401, {'error':'unauthorized'})
-            data = parse_body(self)
-            code = data.get('course_code')
-            city = data.get('city','')
-            country = data.get('country','')
-            abroad = bool(data.get('abroad'))
-            budget = int(data.get('budget') or 0)
-            include_private = bool(data.get('include_private', True))
-            include_government = bool(data.get('include_government', True))
-            allc = query_all('SELECT * FROM colleges')
-            filt = filter_colleges(allc, code, city, country, abroad, budget, include_private, include_government) # pyright: ignore[reportArgumentType]
-            for r in filt:
-                r.pop('city_score', None)
-            return json_response(self, 200, {'colleges': filt})
-
-        return json_response(self, 404, {'error':'not found'})
+        if not api.dispatch(self, 'POST'):
+            return json_response(self, 404, {'error':'not found'})
 
     def do_GET(self):
-        if self.path.startswith('/api/college?id='):
-            qs = urlparse.urlparse(self.path).query
-            q = urlparse.parse_qs(qs)
-            cid = int(q.get('id',['0'])[0])
-            row = query_one('SELECT * FROM colleges WHERE id=?', (cid,))
-            if not row:
-                return json_response(self, 404, {'error':'not found'})
-            return json_response(self, 200, {'college': row})
-        # Static files (frontend)
-        return super().do_GET()
-
-
-def start_server(host='127.0.0.1', port=8000):
+        if api.dispatch(self, 'GET'):
+            return
+        # Static files (frontend), served from memory; nothing is read from
+        # disk per request, so paths can never escape FRONTEND_DIR
+        if static_assets.serve(self):
+            return
+        self.send_error(404, 'File not found')
+
+    def do_HEAD(self):
+        if not self.path.startswith('/api/') and static_assets.serve(self, head=True):
+            return
+        self.send_error(404, 'File not found')
+
+
+class KeepAliveHandler(Handler):
+    # HTTP/1.1 keeps the connection open between requests. The timeout bounds
+    # a stalled request; an idle connection gives its worker up as soon as
+    # another connection is waiting for one (PooledHTTPServer.process_request).
+    protocol_version = 'HTTP/1.1'
+    timeout = 15
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # second one waits on the client's delayed ACK (~40ms per response).
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.served = 0
+
+    def handle_one_request(self):
+        # Wait for the request line outside the timed section; between
+        # requests the connection is idle and a draining server may close it
+        if not self.server.wait_for_request(self, first=not self.served):
+            self.close_connection = True
+            return
+        super().handle_one_request()
+        self.served += 1
+
+    def end_headers(self):
+        if self.server.draining:
+            self.send_header('Connection', 'close')
+        super().end_headers()
+
+    def do_POST(self):
+        self.body_read = False
+        try:
+            super().do_POST()
+        finally:
+            # Early returns (e.g. unauthorized) leave the body on the socket;
+            # drain it so the next request on this connection parses cleanly.
+            if not self.body_read:
+                length = int(self.headers.get('Content-Length', '0'))
+                if length:
+                    self.rfile.read(length)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands accepted connections to a fixed pool of worker threads.
+
+    The hand-off queue is bounded, so when every worker is busy the accept loop
+    blocks and new clients wait in the listen backlog instead of piling up
+    threads.
+    """
+    request_queue_size = 128
+
+    def __init__(self, server_address, RequestHandlerClass, workers=16, queue_size=64, reuse_port=False):
+        self.workers = workers
+        self.reuse_port = reuse_port
+        self.draining = False
+        self._requests = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        # socket -> True while waiting for its first (already queued) request
+        self._idle = {}
+        self._free = 0
+        self._idle_lock = threading.Lock()
+        super().__init__(server_address, RequestHandlerClass)
+        for i in range(workers):
+            t = threading.Thread(target=self._work, name=f'http-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def server_bind(self):
+        if self.reuse_port:
+            # Several processes bind the same port; the kernel spreads
+            # incoming connections across their listen queues
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def wait_for_request(self, handler, first=False) -> bool:
+        # Blocks until the client sends something. False on EOF, idle
+        # timeout, or when draining (except for a connection's first request,
+        # which was already accepted and queued).
+        with self._idle_lock:
+            if self.draining and not first:
+                return False
+            self._idle[handler.connection] = first
+        try:
+            return bool(handler.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            with self._idle_lock:
+                self._idle.pop(handler.connection, None)
+
+    def drain(self):
+        # Ends keep-alive: idle connections are closed now, busy ones after
+        # their current response. Call after shutdown(), before server_close().
+        with self._idle_lock:
+            self.draining = True
+            idle = list(self._idle)
+        for sock in idle:
+            try:
+                sock.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+
+    def process_request(self, request, client_address):
+        self._requests.put((request, client_address))
+        # With no worker free, close one idle keep-alive connection so its
+        # worker takes the new one instead of sitting out the idle timeout
+        with self._idle_lock:
+            if self._requests.qsize() <= self._free:
+                return
+            sock = next((s for s, first in self._idle.items() if not first), None)
+            if sock is None:
+                return
+            del self._idle[sock]
+        try:
+            sock.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def _work(self):
+        while True:
+            with self._idle_lock:
+                self._free += 1
+            item = self._requests.get()
+            with self._idle_lock:
+                self._free -= 1
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._threads:
+            self._requests.put(None)
+        for t in self._threads:
+            t.join()
+
+
+def make_server(host='127.0.0.1', port=8000, mode='simple', workers=16, reuse_port=False):
+    if mode == 'simple':
+        return HTTPServer((host, port), Handler)
+    if mode == 'pooled':
+        return PooledHTTPServer((host, port), KeepAliveHandler, workers=workers, reuse_port=reuse_port)
+    raise ValueError(f'unknown server mode: {mode}')
+
+
+def warm_caches():
+    question_cache.get()
+    college_index.state()
+    resource_cache.get()
+    static_assets.assets()
+
+
+def serve(httpd, reap=True, weights_path=weights.WEIGHTS_FILE):
+    # Runs httpd until SIGINT/SIGTERM, then stops accepting, lets in-flight
+    # requests finish and tears down the background threads
+    feed = ChangeFeed()
+    feed.start()
+    watcher = weights.WeightsWatcher(weights_path, on_reload=lambda model: recommendation_cache.clear())
+    watcher.start()
+    reaper = sessions.SessionReaper() if reap else None
+    if reaper:
+        reaper.start()
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    accept = threading.Thread(target=httpd.serve_forever, name='http-accept', daemon=True)
+    accept.start()
+    try:
+        while accept.is_alive() and not stop.wait(1):
+            pass
+    finally:
+        httpd.shutdown()
+        if isinstance(httpd, PooledHTTPServer):
+            httpd.drain()
+        httpd.server_close()
+        # Every request has been answered; commit what they queued
+        writebehind.writer.stop()
+        if reaper:
+            reaper.stop()
+        feed.stop()
+        watcher.stop()
+        hashing.hash_pool.shutdown()
+        if metrics.profiler:
+            for path in metrics.profiler.dump():
+                print(f'profile: {path}')
+        close_pool()
+
+
+def start_server(host='127.0.0.1', port=8000, mode='simple', workers=16, hash_workers=0, hash_queue=None,
+                 profile_slowest=0, profile_dir='profiles', processes=1, json_encoder='auto', gzip_min_size=None,
+                 weights_path=weights.WEIGHTS_FILE, write_batch=0, write_delay=writebehind.MAX_DELAY,
+                 write_queue=writebehind.MAX_PENDING):
     init_db()
-    httpd = HTTPServer((host, port), Handler)
-    print(f"Server running at http://{host}:{port}")
-    httpd.serve_forever()
+    serialize.use(json_encoder)
+    configure_gzip(gzip_min_size)
+    print(f'scoring weights: {weights.load(weights_path).version}')
+    if processes > 1:
+        from .prefork import run
+        return run(host, port, processes, workers, hash_workers, hash_queue, profile_slowest, profile_dir,
+                   weights_path=weights_path, write_batch=write_batch, write_delay=write_delay, write_queue=write_queue)
+    if profile_slowest:
+        metrics.enable_profiler(profile_slowest, profile_dir)
+    hashing.configure(hash_workers, hash_queue)
+    writebehind.configure(write_batch, write_delay, write_queue)
+    warm_caches()
+    httpd = make_server(host, port, mode, workers)
+    print(f"Server running at http://{host}:{port} ({mode})")
+    serve(httpd, weights_path=weights_path)
 
 if __name__ == '__main__':
-    start_server()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description='CareerPath API server')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8000)
+    ap.add_argument('--mode', choices=('simple', 'pooled'), default='simple')
+    ap.add_argument('--workers', type=int, default=16)
+    ap.add_argument('--processes', type=int, default=1,
+                    help='pre-fork this many server processes on one port (implies --mode pooled)')
+    ap.add_argument('--hash-workers', type=int, default=0, help='processes for password hashing (0 = inline)')
+    ap.add_argument('--hash-queue', type=int, default=None, help='max hashes queued or running before 503')
+    ap.add_argument('--profile-slowest', type=int, default=0, metavar='N',
+                    help='cProfile every request and dump stats for the slowest N on exit')
+    ap.add_argument('--profile-dir', default='profiles')
+    ap.add_argument('--json', choices=('auto', 'stdlib', 'orjson'), default='auto',
+                    help='JSON encoder for API responses (auto = orjson if installed)')
+    ap.add_argument('--gzip-min-size', type=int, default=None, metavar='BYTES',
+                    help='gzip API responses of at least this size for clients that accept it')
+    ap.add_argument('--weights', default=weights.WEIGHTS_FILE,
+                    help='scoring weights artifact from ml_train --train (reloaded when it changes)')
+    ap.add_argument('--write-batch', type=int, default=0, metavar='N',
+                    help='group-commit form and test writes, up to N per transaction (0 = commit each inline)')
+    ap.add_argument('--write-delay-ms', type=float, default=writebehind.MAX_DELAY * 1000,
+                    help='how long a write batch stays open for more writes')
+    ap.add_argument('--write-queue', type=int, default=writebehind.MAX_PENDING,
+                    help='max queued writes before 503')
+    args = ap.parse_args()
+    start_server(args.host, args.port, args.mode, args.workers, args.hash_workers, args.hash_queue,
+                 args.profile_slowest, args.profile_dir, args.processes, args.json, args.gzip_min_size,
+                 args.weights, args.write_batch, args.write_delay_ms / 1000, args.write_queue)
@@ -0,0 +1,147 @@
+"""Login sessions: token lookup cache and expired-row reaper.
+
+``lookup`` answers from an in-process TTL cache and only falls back to the
+``sessions`` table on a miss. Entries are trusted until the session expires
+or ``CACHE_TTL`` passes, whichever is first; ``revoke`` (logout) evicts
+immediately. A background ``SessionReaper`` deletes expired rows in small
+batches so the table stays bounded.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from .db import connect, execute, query_one, on_change, notify_change
+
+SESSION_DAYS = 7
+CACHE_SIZE = 50_000
+CACHE_TTL = 300
+REAP_INTERVAL = 3600
+REAP_BATCH = 1000
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def make_token() -> str:
+    return secrets.token_hex(32)
+
+
+def _epoch(ts: str) -> float:
+    # sessions.expires_at is stored as UTC text, same as datetime("now")
+    return datetime.strptime(ts, _TS_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+class TokenCache:
+    """Bounded token -> user_id map with per-entry expiry.
+
+    When full, the least recently used entries go; expired ones are dropped
+    when a lookup finds them. Unknown or invalid tokens are never cached.
+    """
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[int]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user_id, valid_until = entry
+            if now >= valid_until:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user_id
+
+    def put(self, token: str, user_id: int, expires_at: float):
+        now = time.time()
+        valid_until = min(expires_at, now + self.ttl)
+        if valid_until <= now:
+            return
+        with self._lock:
+            self._entries[token] = (user_id, valid_until)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, tokens=None):
+        # tokens=None drops everything (e.g. sessions changed elsewhere)
+        with self._lock:
+            if tokens is None:
+                self._entries.clear()
+            else:
+                for t in tokens:
+                    self._entries.pop(t, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+on_change('sessions', token_cache.discard)
+
+
+def create(user_id: int) -> str:
+    token = make_token()
+    expires = (datetime.utcnow() + timedelta(days=SESSION_DAYS)).strftime(_TS_FORMAT)
+    execute('INSERT INTO sessions(user_id, token, expires_at) VALUES(?,?,?)', (user_id, token, expires))
+    token_cache.put(token, user_id, _epoch(expires))
+    return token
+
+
+def lookup(token: str) -> Optional[int]:
+    if not token:
+        return None
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+    row = query_one('SELECT user_id, expires_at FROM sessions WHERE token=? AND expires_at>datetime("now")', (token,))
+    if not row:
+        return None
+    token_cache.put(token, row['user_id'], _epoch(row['expires_at']))
+    return row['user_id']
+
+
+def revoke(token: str):
+    execute('DELETE FROM sessions WHERE token=?', (token,))
+    notify_change('sessions', [token])
+
+
+def reap_expired(batch=REAP_BATCH, pause=0.01) -> int:
+    # Deletes expired rows a batch per transaction so writers are never
+    # blocked for long; returns how many rows went.
+    total = 0
+    while True:
+        with connect() as con:
+            cur = con.execute('DELETE FROM sessions WHERE id IN '
+                              '(SELECT id FROM sessions WHERE expires_at<=datetime("now") LIMIT ?)', (batch,))
+            n = cur.rowcount
+        total += n
+        if n < batch:
+            return total
+        time.sleep(pause)
+
+
+class SessionReaper(threading.Thread):
+    def __init__(self, interval=REAP_INTERVAL, batch=REAP_BATCH):
+        super().__init__(name='session-reaper', daemon=True)
+        self.interval = interval
+        self.batch = batch
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                reap_expired(self.batch)
+            except Exception as e:
+                print(f'session reaper: {e}')
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,168 @@
+"""Precompressed, in-memory static assets for the frontend.
+
+Every file under ``frontend/`` is read once and kept in memory together
+with its gzip (and, when the optional ``brotli`` package is installed,
+brotli) encodings and a strong ETag. Non-HTML assets are also reachable
+under a fingerprinted name (``app.<hash>.js``) that is served with a
+one-year immutable Cache-Control; HTML pages are rewritten to reference
+those names and are themselves served with ``no-cache`` so they always
+revalidate (a 304 when unchanged).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+_REF = re.compile(r'''(\b(?:src|href)=["'])([^"'#?]+)(["'])''')
+
+
+def accepted_encodings(accept_encoding):
+    # Content codings named in an Accept-Encoding header, minus any with q=0
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+class Asset:
+    __slots__ = ('path', 'content_type', 'etag', 'cache_control', 'variants')
+
+    def __init__(self, path, content_type, data, cache_control):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        # encoding -> (etag, body); each representation has its own strong ETag
+        self.variants = {'identity': (self.etag, data)}
+        if content_type.startswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gz) < len(data):
+                self.variants['gzip'] = (f'"{digest}-gz"', gz)
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                if len(br) < len(data):
+                    self.variants['br'] = (f'"{digest}-br"', br)
+
+    def pick(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+
+class AssetStore:
+    def __init__(self, root):
+        self.root = root
+        self._assets = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        files = {}
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                full = os.path.join(dirpath, name)
+                rel = os.path.relpath(full, self.root).replace(os.sep, '/')
+                with open(full, 'rb') as f:
+                    files[rel] = f.read()
+
+        assets = {}
+        fingerprinted = {}
+        for rel, data in files.items():
+            if rel.endswith('.html'):
+                continue
+            ctype = mimetypes.guess_type(rel)[0] or 'application/octet-stream'
+            if ctype.startswith('text/'):
+                ctype += '; charset=utf-8'
+            stem, ext = os.path.splitext(rel)
+            name = f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+            fingerprinted[rel] = name
+            assets['/' + rel] = Asset(rel, ctype, data, REVALIDATE)
+            assets['/' + name] = Asset(rel, ctype, data, IMMUTABLE)
+
+        for rel, data in files.items():
+            if not rel.endswith('.html'):
+                continue
+            base = os.path.dirname(rel)
+
+            def swap(m):
+                ref = m.group(2)
+                target = os.path.normpath(os.path.join(base, ref)).replace(os.sep, '/')
+                if '://' in ref or ref.startswith('/') or target not in fingerprinted:
+                    return m.group(0)
+                new = os.path.join(os.path.dirname(ref), os.path.basename(fingerprinted[target])).replace(os.sep, '/')
+                return m.group(1) + new + m.group(3)
+
+            html = _REF.sub(swap, data.decode('utf-8')).encode('utf-8')
+            assets['/' + rel] = Asset(rel, 'text/html; charset=utf-8', html, REVALIDATE)
+        if '/index.html' in assets:
+            assets['/'] = assets['/index.html']
+        return assets
+
+    def assets(self):
+        assets = self._assets
+        if assets is None:
+            with self._lock:
+                if self._assets is None:
+                    self._assets = self.load()
+                assets = self._assets
+        return assets
+
+    def reload(self):
+        with self._lock:
+            self._assets = self.load()
+
+    def url_for(self, rel):
+        # Fingerprinted URL of a non-HTML asset, e.g. url_for('app.js')
+        for path, asset in self.assets().items():
+            if asset.path == rel and asset.cache_control == IMMUTABLE:
+                return path
+        return None
+
+    def serve(self, handler, head=False):
+        # Writes the asset for handler.path; returns False if there is none
+        path = handler.path.split('?', 1)[0].split('#', 1)[0]
+        asset = self.assets().get(path)
+        if asset is None:
+            return False
+        encoding = asset.pick(handler.headers.get('Accept-Encoding'))
+        etag, body = asset.variants[encoding]
+        if_none_match = handler.headers.get('If-None-Match')
+        if if_none_match:
+            tags = {t.strip() for t in if_none_match.split(',')}
+            tags |= {t[2:] for t in tags if t.startswith('W/')}
+            if '*' in tags or etag in tags:
+                handler.send_response(304)
+                handler.send_header('ETag', etag)
+                handler.send_header('Cache-Control', asset.cache_control)
+                handler.send_header('Vary', 'Accept-Encoding')
+                handler.end_headers()
+                return True
+        handler.send_response(200)
+        handler.send_header('Content-Type', asset.content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.send_header('ETag', etag)
+        handler.send_header('Cache-Control', asset.cache_control)
+        handler.send_header('Vary', 'Accept-Encoding')
+        if encoding != 'identity':
+            handler.send_header('Content-Encoding', encoding)
+        handler.end_headers()
+        if not head:
+            handler.wfile.write(body)
+        return True
@@ -1,12 +1,18 @@
 
 import json
 import os
-from typing import List, Dict
-from .db import connect, execute, query_all
+import random
+import secrets
+import threading
+from typing import List, Dict, Optional, Iterable
+from .db import connect, query_all, on_change, notify_change
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SAMPLE_DIR = os.path.join(BASE_DIR, 'sample_data')
 
+QUESTIONS_PER_TEST = 20
+STRATEGIES = ('balanced', 'random', 'fixed')
+
 QUESTIONS_MAP = {
     'aptitude': os.path.join(SAMPLE_DIR, 'questions_aptitude.json'),
     'personality': os.path.join(SAMPLE_DIR, 'questions_personality.json')
@@ -19,44 +25,143 @@ def load_questions(kind: str) -> List[dict]:
         return json.load(f)
 
 
+def import_questions(kind: str, questions: List[dict]):
+    # Every write to test_questions should go through here (or call
+    # notify_change itself) so the scoring cache is dropped.
+    with connect() as con:
+        con.executemany('INSERT INTO test_questions(kind, question, options_json, answer_key, trait_map_json, difficulty) VALUES(?,?,?,?,?,?)', [(
+            kind,
+            q['question'],
+            json.dumps(q['options']),
+            q.get('answer_key'),
+            json.dumps(q.get('traits', {})),
+            q.get('difficulty')
+        ) for q in questions])
+    notify_change('test_questions')
+
+
 def seed_questions_if_empty():
     existing = query_all('SELECT COUNT(1) AS n FROM test_questions')
     if existing and existing[0]['n'] > 0:
         return
     for kind in ('aptitude','personality'):
-        for q in load_questions(kind):
-            execute('INSERT INTO test_questions(kind, question, options_json, answer_key, trait_map_json) VALUES(?,?,?,?,?)', (
-                kind,
-                q['question'],
-                json.dumps(q['options']),
-                q.get('answer_key'),
-                json.dumps(q.get('traits', {}))
-            ))
-
-
-def score_aptitude(answers: Dict[int, str]) -> int:
-    # answers: {question_id: chosen_key}
-    with connect() as con:
-        rows = con.execute('SELECT id, answer_key FROM test_questions WHERE kind="aptitude"').fetchall()
-        ans_map = {r['id']: r['answer_key'] for r in rows}
+        import_questions(kind, load_questions(kind))
+
+
+class QuestionCache:
+    """The decoded question bank, loaded once per version.
+
+    Holds the client-facing question dicts, ids per kind (and per
+    difficulty), answer keys and trait maps.
+
+    ``version`` is bumped by ``invalidate`` (wired to changes on
+    test_questions); the next reader reloads from the DB. A load that races
+    with an invalidation is used once but not kept.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._data = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, ids=None):
+        with self._lock:
+            self.version += 1
+            self._data = None
+
+    def get(self):
+        data = self._data
+        if data is None:
+            version = self.version
+            data = self._load()
+            with self._lock:
+                if self.version == version:
+                    self._data = data
+        return data
+
+    def _load(self):
+        with connect() as con:
+            rows = con.execute('SELECT id, kind, question, options_json, answer_key, trait_map_json, difficulty '
+                               'FROM test_questions ORDER BY id').fetchall()
+        questions = {}
+        ids = {}
+        by_difficulty = {}
+        answer_keys = {}
+        trait_maps = {}
+        for r in rows:
+            questions[r['id']] = {'id': r['id'], 'question': r['question'], 'options': json.loads(r['options_json'])}
+            ids.setdefault(r['kind'], []).append(r['id'])
+            by_difficulty.setdefault(r['kind'], {}).setdefault(r['difficulty'] or 2, []).append(r['id'])
+            if r['kind'] == 'aptitude':
+                answer_keys[r['id']] = r['answer_key']
+            else:
+                # trait_map like {"A": {"Analytical":2}, "B": {"Creative":2}}
+                raw = json.loads(r['trait_map_json'] or '{}')
+                trait_map = {opt: [(trait, int(pts)) for trait, pts in traits.items()]
+                             for opt, traits in raw.items()}
+                trait_maps[r['id']] = trait_map
+        return {'questions': questions, 'ids': ids, 'by_difficulty': by_difficulty,
+                'answer_keys': answer_keys, 'trait_maps': trait_maps}
+
+
+question_cache = QuestionCache()
+on_change('test_questions', question_cache.invalidate)
+
+
+def assemble_test(kind: str, count: int = QUESTIONS_PER_TEST, strategy: str = 'balanced',
+                  seed: Optional[int] = None) -> List[int]:
+    # Picks question ids for one session from the cached bank.
+    #   fixed    - the first `count` by id (the original behaviour)
+    #   random   - uniform sample
+    #   balanced - round-robin across difficulty levels, random within each
+    bank = question_cache.get()
+    ids = bank['ids'].get(kind, [])
+    if strategy == 'fixed' or count >= len(ids):
+        return ids[:count]
+    rng = random.Random(secrets.randbits(64) if seed is None else seed)
+    if strategy == 'random':
+        return rng.sample(ids, count)
+    buckets = [rng.sample(b, min(len(b), count))
+               for _, b in sorted(bank['by_difficulty'].get(kind, {}).items())]
+    picked = []
+    while len(picked) < count:
+        for b in buckets:
+            if b and len(picked) < count:
+                picked.append(b.pop())
+    rng.shuffle(picked)
+    return picked
+
+
+def questions_for(ids: Iterable[int]) -> List[dict]:
+    # Client-facing {id, question, options} dicts; shared, do not mutate
+    questions = question_cache.get()['questions']
+    return [questions[i] for i in ids if i in questions]
+
+
+def score_aptitude(answers: Dict[int, str], issued: Optional[Iterable[int]] = None) -> int:
+    # answers: {question_id: chosen_key}; only `issued` ids count when given
+    ans_map = question_cache.get()['answer_keys']
+    issued = set(issued) if issued is not None else None
     score = 0
     for qid, chosen in answers.items():
-        if ans_map.get(int(qid)) == chosen:
+        qid = int(qid)
+        if issued is not None and qid not in issued:
+            continue
+        if ans_map.get(qid) == chosen:
             score += 1
     return score  # out of number of aptitude questions
 
 
-def score_personality(answers: Dict[int, str]) -> Dict[str, int]:
-    # Sum trait points from selected options
+def score_personality(answers: Dict[int, str], issued: Optional[Iterable[int]] = None) -> Dict[str, int]:
+    # Sum trait points from selected options, in question id order
+    trait_maps = question_cache.get()['trait_maps']
     trait_totals: Dict[str, int] = {}
-    with connect() as con:
-        rows = con.execute('SELECT id, options_json, trait_map_json FROM test_questions WHERE kind="personality"').fetchall()
-    for r in rows:
-        qid = r['id']
-        trait_map = json.loads(r['trait_map_json'] or '{}')
+    for qid in sorted(set(issued) if issued is not None else answers):
+        trait_map = trait_maps.get(qid)
+        if trait_map is None:
+            continue
         chosen_key = answers.get(qid)
         if chosen_key and chosen_key in trait_map:
-            # trait_map like {"A": {"Analytical":2}, "B": {"Creative":2}}
-            for trait, pts in trait_map[chosen_key].items():
-                trait_totals[trait] = trait_totals.get(trait, 0) + int(pts)
+            for trait, pts in trait_map[chosen_key]:
+                trait_totals[trait] = trait_totals.get(trait, 0) + pts
     return trait_totals
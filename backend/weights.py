@@ -0,0 +1,114 @@
+"""Versioned scoring-weight artifacts and hot reload.
+
+An artifact is a small JSON file written by ``ml_train --train``::
+
+    {"format": 1, "version": "20260101120000-3f2a9c1d", "trained_at": ...,
+     "samples": 1234, "weights": {"aptitude": 1.7, ..., "course_bias": {...}}}
+
+``load`` compiles it into a ``logic.ScoringModel`` and swaps it in as one
+reference assignment, so a request sees either the old or the new weights,
+never a mix. ``WeightsWatcher`` polls the file and reloads when it changes;
+writers replace it atomically (``save``), so a half-written file is never
+read.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from . import logic
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEIGHTS_FILE = os.path.join(BASE_DIR, 'model_weights.json')
+RELOAD_INTERVAL = 5
+
+
+def save(weights: dict, path=WEIGHTS_FILE, **meta) -> dict:
+    body = json.dumps(weights, sort_keys=True, separators=(',', ':'))
+    now = datetime.now(timezone.utc)
+    artifact = {
+        'format': logic.WEIGHTS_FORMAT,
+        'version': f"{now:%Y%m%d%H%M%S}-{hashlib.sha256(body.encode('utf-8')).hexdigest()[:8]}",
+        'trained_at': now.strftime('%Y-%m-%d %H:%M:%S'),
+        **meta,
+        'weights': weights,
+    }
+    fd, tmp = tempfile.mkstemp(prefix='.weights-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(artifact, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return artifact
+
+
+def read(path=WEIGHTS_FILE) -> logic.ScoringModel:
+    with open(path, 'r', encoding='utf-8') as f:
+        artifact = json.load(f)
+    if artifact.get('format') != logic.WEIGHTS_FORMAT:
+        raise ValueError(f"{path}: unsupported weights format {artifact.get('format')!r}")
+    weights = artifact['weights']
+    unknown = set(weights) - set(logic.DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f'{path}: unknown weights {sorted(unknown)}')
+    return logic.ScoringModel(weights, artifact['version'])
+
+
+def load(path=WEIGHTS_FILE) -> logic.ScoringModel:
+    # Installs the artifact at path, or the built-in defaults if there is none
+    model = read(path) if os.path.exists(path) else logic.ScoringModel()
+    logic.set_model(model)
+    return model
+
+
+class WeightsWatcher(threading.Thread):
+    """Reloads the weights artifact when its mtime or size changes.
+
+    A file that fails to load is reported and skipped; the current model
+    stays in place. ``on_reload(model)`` runs after every swap.
+    """
+
+    def __init__(self, path=WEIGHTS_FILE, interval=RELOAD_INTERVAL,
+                 on_reload: Optional[Callable[[logic.ScoringModel], None]] = None):
+        super().__init__(name='weights-watcher', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.on_reload = on_reload
+        self._stop_event = threading.Event()
+        self._seen = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def check(self) -> bool:
+        stat = self._stat()
+        if stat == self._seen:
+            return False
+        self._seen = stat
+        try:
+            model = load(self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f'weights: keeping version {logic.current_model().version}: {e}')
+            return False
+        print(f'weights: loaded version {model.version}')
+        if self.on_reload:
+            self.on_reload(model)
+        return True
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
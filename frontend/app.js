@@ -215,9 +215,22 @@ async function getRecommendations(){
   }
 }
 
+// Courses the user explores are recorded once each; they train the scoring weights
+const CHOSEN = new Set();
+function recordChoice(code){
+  if(!code || CHOSEN.has(code)) return;
+  CHOSEN.add(code);
+  fetch(API + '/choice', {
+    method:'POST',
+    headers: authHeaders(),
+    body: JSON.stringify({ course_code: code })
+  }).catch(()=>{});
+}
+
 async function loadResources(){
   try{
     const code = $('coursePick').value;
+    recordChoice(code);
     const r = await fetch(API + '/resources', { 
       method:'POST', 
       headers: authHeaders(), 
@@ -240,6 +253,7 @@ async function loadResources(){
 async function loadColleges(){
   try{
     const code = $('coursePick').value;
+    recordChoice(code);
     const payload = {
       course_code: code,
       city: $('city').value,
@@ -273,6 +287,9 @@ async function loadColleges(){
 
 /* ----------------- Utilities ----------------- */
 function logout(){
+  if(TOKEN){
+    fetch(API + '/logout', { method:'POST', headers: authHeaders() }).catch(()=>{});
+  }
   localStorage.removeItem('token');
   TOKEN = '';
   show('auth');